@@ -6,21 +6,28 @@ y proporciona acceso a los valores en toda la aplicación.
 
 import logging
 import os
+import pickle
+import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Optional
 
-import yaml
-
-
 # Rutas base
 PROJECT_ROOT = Path(__file__).parent.parent
 CONFIG_PATH = PROJECT_ROOT / 'config' / 'settings.yaml'
 DATA_PATH = PROJECT_ROOT / 'data'
 OUTPUT_PATH = PROJECT_ROOT / 'output'
+CACHE_PATH = PROJECT_ROOT / '.cache'
 
 # Configuración cargada
 _config: dict = {}
 
+# Referencias a variables de entorno: ${VAR}
+_ENV_RE = re.compile(r'\$\{(\w+)\}')
+
+# Centinela para distinguir "clave ausente" de "valor None"
+_MISS = object()
+
 
 def load_config(config_path: Optional[Path] = None) -> dict:
     """Carga la configuración desde el archivo YAML.
@@ -36,25 +43,75 @@ def load_config(config_path: Optional[Path] = None) -> dict:
     path = config_path or CONFIG_PATH
     
     if path.exists():
-        with open(path, 'r', encoding='utf-8') as f:
-            _config = yaml.safe_load(f) or {}
+        _config = _read_yaml_cached(path)
     else:
         _config = {}
     
     # Expandir variables de entorno
     _expand_env_vars(_config)
     
+    # Invalidar búsquedas memoizadas de la configuración anterior
+    _resolve.cache_clear()
+    
     return _config
 
 
+def get_yaml_loader() -> type:
+    """Devuelve el loader YAML: libyaml (C) si está disponible, si no el puro Python.
+    
+    PyYAML se importa aquí y no a nivel de módulo: con el sidecar
+    de la configuración válido no llega a cargarse.
+    """
+    import yaml
+    
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _read_yaml_cached(path: Path) -> dict:
+    """Lee un YAML usando un sidecar pickle invalidado por mtime y tamaño.
+    
+    El sidecar guarda el YAML parseado SIN expandir variables de entorno,
+    para no persistir secretos en disco. Cualquier fallo del cache
+    (corrupto, sin permisos) cae al parseo normal del YAML.
+    """
+    stat = path.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+    sidecar = CACHE_PATH / f'{path.stem}.pkl'
+    
+    try:
+        with open(sidecar, 'rb') as f:
+            cached_key, data = pickle.load(f)
+        if cached_key == key:
+            return data
+    except Exception:
+        pass
+    
+    import yaml
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        data = yaml.load(f, Loader=get_yaml_loader()) or {}
+    
+    try:
+        CACHE_PATH.mkdir(parents=True, exist_ok=True)
+        with open(sidecar, 'wb') as f:
+            pickle.dump((key, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+    
+    return data
+
+
 def _expand_env_vars(d: dict) -> None:
-    """Expande variables de entorno ${VAR} en los valores."""
-    for key, value in d.items():
-        if isinstance(value, dict):
-            _expand_env_vars(value)
-        elif isinstance(value, str) and value.startswith('${') and value.endswith('}'):
-            env_var = value[2:-1]
-            d[key] = os.environ.get(env_var, '')
+    """Expande variables de entorno ${VAR} en los valores (también embebidas y en listas)."""
+    stack = [d]
+    while stack:
+        current = stack.pop()
+        items = current.items() if isinstance(current, dict) else enumerate(current)
+        for key, value in items:
+            if isinstance(value, (dict, list)):
+                stack.append(value)
+            elif isinstance(value, str) and '${' in value:
+                current[key] = _ENV_RE.sub(lambda m: os.environ.get(m.group(1), ''), value)
 
 
 def get(key: str, default: Any = None) -> Any:
@@ -76,14 +133,20 @@ def get(key: str, default: Any = None) -> Any:
     if not _config:
         load_config()
     
-    keys = key.split('.')
+    value = _resolve(key)
+    return default if value is _MISS else value
+
+
+@lru_cache(maxsize=256)
+def _resolve(key: str) -> Any:
+    """Resuelve una clave con puntos sobre _config (memoizado)."""
     value = _config
     
-    for k in keys:
+    for k in key.split('.'):
         if isinstance(value, dict) and k in value:
             value = value[k]
         else:
-            return default
+            return _MISS
     
     return value
 
@@ -107,8 +170,9 @@ load_config()
 # Logging
 # =============================================================================
 
+@lru_cache(maxsize=1)
 def setup_logging() -> logging.Logger:
-    """Configura y devuelve el logger principal."""
+    """Configura y devuelve el logger principal (solo la primera vez)."""
     log_level = get('logging.level', 'INFO')
     log_file = get('logging.file')
     
@@ -135,5 +199,24 @@ def setup_logging() -> logging.Logger:
     return logger
 
 
-# Logger global
-logger = setup_logging()
+class _DeferredSetupHandler(logging.Handler):
+    """Handler provisional que configura el logging con el primer registro.
+    
+    Evita crear handlers y abrir el fichero de log en ejecuciones que
+    nunca llegan a registrar nada (--help, version...).
+    """
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        target = logging.getLogger('istac_assistant')
+        # Sustituir la lista (no mutarla): el logger la está recorriendo ahora
+        target.handlers = [h for h in target.handlers if h is not self]
+        setup_logging()
+        for handler in target.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+# Logger global: nivel inmediato, handlers al primer registro
+logger = logging.getLogger('istac_assistant')
+logger.setLevel(getattr(logging, get('logging.level', 'INFO'), logging.INFO))
+logger.addHandler(_DeferredSetupHandler())
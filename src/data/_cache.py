@@ -0,0 +1,146 @@
+"""Cache de metadatos compartida por los clientes de datos del ISTAC.
+
+Los metadatos (fichas de indicador, temáticas, listados) cambian en días,
+así que se memoizan en memoria y en disco. Los datos no se cachean aquí:
+son grandes y dependen de los filtros.
+"""
+
+import copy
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from .. import config
+
+
+# ============================================================================
+# PETICIONES EN VUELO (single-flight)
+# ============================================================================
+
+_inflight: Dict[Hashable, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def singleflight(key: Hashable, fn: Callable[[], Any]) -> Any:
+    """Ejecuta fn() una sola vez por clave entre llamadas concurrentes.
+
+    Si otro hilo ya está resolviendo la misma clave, se espera a su
+    resultado (o excepción) en lugar de repetir la petición. Al terminar
+    se olvida la clave: no es una cache.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = Future()
+
+    if not owner:
+        return future.result()
+
+    try:
+        future.set_result(fn())
+    except BaseException as e:
+        future.set_exception(e)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+    return future.result()
+
+
+def _write_pickle(cache_dir: Path, path: Path, value: Any) -> None:
+    """Guarda value en path de forma atómica (ignora fallos del disco).
+
+    Se escribe a un temporal del mismo directorio y se renombra: otro hilo o
+    proceso nunca lee un pickle a medio escribir.
+    """
+    tmp_name = None
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            'wb', dir=cache_dir, prefix=path.stem, suffix='.tmp', delete=False
+        ) as f:
+            tmp_name = f.name
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, path)
+    except Exception:
+        if tmp_name is not None:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+
+def cached_metadata(
+    cache_dir: Path,
+    ttl_setting: str = 'storage.cache_ttl_hours',
+    default_ttl_hours: float = 24,
+) -> Callable[[Callable], Callable]:
+    """Crea un decorador que memoiza métodos de metadatos en memoria y en disco.
+
+    Los resultados se reutilizan durante las horas indicadas por
+    ttl_setting (storage.cache_ttl_hours, 24 h por defecto). Los resultados
+    vacíos o None (errores) no se guardan. Cualquier fallo del disco se ignora.
+
+    El método decorado acepta ``refresh=True`` para ignorar la cache y
+    volver a consultar la API, y expone ``cache_clear()`` para vaciar la
+    cache en memoria.
+
+    La clave es el nombre del método, el ``base_url`` de la instancia (si
+    lo tiene) y los argumentos: instancias con la misma configuración
+    comparten resultados. Cada llamada recibe una copia superficial, así
+    que modificar la lista o el dict devuelto no altera la cache.
+
+    Args:
+        cache_dir: Directorio de los ficheros .pkl (uno por cliente).
+        ttl_setting: Clave de configuración con la validez en horas.
+        default_ttl_hours: Validez si la clave no está configurada.
+    """
+    def decorator(func: Callable) -> Callable:
+        memo: Dict[Tuple, Tuple[float, Any]] = {}
+
+        @functools.wraps(func)
+        def wrapper(self, *args, refresh: bool = False, **kwargs):
+            ttl = config.get(ttl_setting, default_ttl_hours) * 3600
+            key = (
+                (func.__name__, getattr(self, 'base_url', None))
+                + args + tuple(sorted(kwargs.items()))
+            )
+            now = time.time()
+            digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+            path = cache_dir / f'{func.__name__}-{digest}.pkl'
+
+            if not refresh:
+                # 1. Memoria
+                hit = memo.get(key)
+                if hit is not None and now - hit[0] < ttl:
+                    return copy.copy(hit[1])
+
+                # 2. Disco (caducidad por mtime)
+                try:
+                    stamp = path.stat().st_mtime
+                    if now - stamp < ttl:
+                        with open(path, 'rb') as f:
+                            value = pickle.load(f)
+                        memo[key] = (stamp, value)
+                        return copy.copy(value)
+                except Exception:
+                    pass
+
+            # 3. API (una sola petición aunque lleguen varios hilos a la vez)
+            value = singleflight(path, lambda: func(self, *args, **kwargs))
+            if value:
+                memo[key] = (now, value)
+                _write_pickle(cache_dir, path, value)
+            return copy.copy(value)
+
+        wrapper.cache_clear = memo.clear
+        return wrapper
+
+    return decorator
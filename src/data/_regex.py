@@ -0,0 +1,25 @@
+"""Expresiones regulares compartidas por el validador y el resolver.
+
+Se compilan una sola vez al importar el paquete de datos.
+"""
+
+import re
+
+
+# Patrones numéricos típicos de datos estadísticos, en una sola alternancia:
+# separador de miles (1.234.567) | porcentajes (12,5%) | números >= 1000
+NUMERIC_RE = re.compile(r'\d{1,3}(?:\.\d{3})+|\d+(?:,\d+)?%|\d{4,}')
+
+# Posibles códigos de indicador en texto libre:
+# PALABRAS_EN_MAYUSCULAS_CON_GUIONES (POBLACION_ALGO, TURISMO_ALGO...)
+CODE_RE = re.compile(r'\b([A-Z][A-Z0-9]*(?:_[A-Z0-9]+)+)\b')
+
+# Tokenizador de códigos en una sola pasada: cada parte separada por '_' es
+# o bien PREFIJO + resto (si la parte tiene > 6 caracteres y empieza por un
+# prefijo conocido, p. ej. SEXOEDAD → SEXO, EDAD) o bien la parte entera.
+# El orden de la alternancia es el de prioridad: gana el primero que encaje.
+KW_RE = re.compile(
+    r'(?:^|(?<=_))'
+    r'(?:(?=[^_]{7})(SEXO|EDAD|ISLA|MUN|REGION|HOMBRE|MUJER|TOTAL)([^_]+)'
+    r'|([^_]*))'
+)
@@ -9,8 +9,17 @@ Regla clave: UN INDICADOR ≠ UN DESGLOSE
 """
 
 import re
-from typing import Dict, List, Optional, Set, Tuple
-from dataclasses import dataclass
+import sys
+import unicodedata
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Sequence, Set, Tuple
+from dataclasses import dataclass, replace
+
+
+def _freeze(table: dict) -> Mapping:
+    """Congela una tabla de vocabulario: claves internadas y vista de solo lectura."""
+    return MappingProxyType({sys.intern(k): v for k, v in table.items()})
 
 
 # =============================================================================
@@ -18,7 +27,7 @@ from dataclasses import dataclass
 # =============================================================================
 
 # Mapeo de palabras a tipos de dimensión
-DIMENSION_KEYWORDS = {
+DIMENSION_KEYWORDS = _freeze({
     # Geográficas
     'isla': 'GEOGRAPHICAL',
     'islas': 'GEOGRAPHICAL',
@@ -62,19 +71,47 @@ DIMENSION_KEYWORDS = {
     'extranjeros': 'NATIONALITY',
     'español': 'NATIONALITY',
     'españoles': 'NATIONALITY',
-}
+})
+
+# Keywords de una palabra (lookup O(1) por token) y de varias palabras (búsqueda de frase)
+_SINGLE_WORD_KEYWORDS = frozenset(k for k in DIMENSION_KEYWORDS if ' ' not in k)
+_MULTI_WORD_KEYWORDS = tuple(k for k in DIMENSION_KEYWORDS if ' ' in k)
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _group_keywords_by_type() -> Dict[str, frozenset]:
+    """Invierte DIMENSION_KEYWORDS: tipo → frozenset de keywords."""
+    by_type: Dict[str, set] = {}
+    for keyword, dim_type in DIMENSION_KEYWORDS.items():
+        by_type.setdefault(dim_type, set()).add(keyword)
+    return {dim_type: frozenset(keywords) for dim_type, keywords in by_type.items()}
+
+
+_KW_BY_TYPE = _group_keywords_by_type()
 
 # Preposiciones que indican desglose
-BREAKDOWN_PREPOSITIONS = {'por', 'según', 'desglosado', 'desagregado', 'distribuido'}
+BREAKDOWN_PREPOSITIONS = frozenset({'por', 'según', 'desglosado', 'desagregado', 'distribuido'})
+
+# Alternativas precompiladas (las keywords más largas primero: "grupos de edad" antes que "edad")
+_PREP_ALT = '|'.join(map(re.escape, sorted(BREAKDOWN_PREPOSITIONS)))
+_DIM_ALT = '|'.join(map(re.escape, sorted(DIMENSION_KEYWORDS, key=len, reverse=True)))
+
+# "por X": detecta la frase de desglose
+_BREAKDOWN_PHRASE_RE = re.compile(rf'\b(?:{_PREP_ALT})\b\s+(\w+)')
+# "por <dimensión>": elimina la frase de desglose completa
+_BREAKDOWN_DIM_RE = re.compile(rf'\b(?:{_PREP_ALT})\s+\w*(?:{_DIM_ALT})\w*\b')
+# Dimensiones sueltas
+_BARE_DIM_RE = re.compile(rf'\b(?:{_DIM_ALT})\b')
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class QueryAnalysis:
-    """Resultado del análisis de una consulta."""
+    """Resultado del análisis de una consulta (inmutable y hashable)."""
     original_query: str
-    indicator_query: str          # Query limpia solo con indicador
-    dimensions: List[str]         # Dimensiones detectadas
-    dimension_types: Set[str]     # Tipos de dimensión
+    indicator_query: str              # Query limpia solo con indicador
+    dimensions: Tuple[str, ...]       # Dimensiones detectadas
+    dimension_types: FrozenSet[str]   # Tipos de dimensión
     has_breakdown: bool           # Si pide desglose
     breakdown_phrase: str         # Frase de desglose detectada
 
@@ -88,14 +125,27 @@ def detect_dimensions(text: str) -> Tuple[List[str], Set[str]]:
     Returns:
         Tupla (lista de dimensiones encontradas, set de tipos)
     """
-    text_lower = text.lower()
-    dimensions = []
-    types = set()
+    return _detect_dimensions_lower(text.lower())
+
+
+def _detect_dimensions_lower(text_lower: str) -> Tuple[List[str], Set[str]]:
+    """Detecta dimensiones en un texto ya en minúsculas.
     
-    for keyword, dim_type in DIMENSION_KEYWORDS.items():
-        if keyword in text_lower:
-            dimensions.append(keyword)
-            types.add(dim_type)
+    Las keywords de una palabra se buscan como palabra completa o en plural
+    ("nacionalidades" → nacionalidad, "meses" → mes).
+    """
+    words = set(_WORD_RE.findall(text_lower))
+    found = words & _SINGLE_WORD_KEYWORDS
+    for word in words:
+        if word.endswith('s'):
+            found.update(_SINGLE_WORD_KEYWORDS.intersection((word[:-1], word[:-2])))
+    for phrase in _MULTI_WORD_KEYWORDS:
+        if phrase in text_lower:
+            found.add(phrase)
+    
+    # Mantener el orden de DIMENSION_KEYWORDS
+    dimensions = [keyword for keyword in DIMENSION_KEYWORDS if keyword in found]
+    types = {dim_type for dim_type, keywords in _KW_BY_TYPE.items() if not keywords.isdisjoint(found)}
     
     return dimensions, types
 
@@ -116,54 +166,45 @@ def analyze_query(query: str) -> QueryAnalysis:
         "población por isla" → indicator="población", dimensions=["isla"]
         "turismo por municipio" → indicator="turismo", dimensions=["municipio"]
     """
-    query_lower = query.lower()
-    original = query
-    
+    analysis = _analyze_normalized_query(query.strip().lower())
+    if analysis.original_query != query:
+        analysis = replace(analysis, original_query=query)
+    return analysis
+
+
+@lru_cache(maxsize=512)
+def _analyze_normalized_query(query_lower: str) -> QueryAnalysis:
+    """Análisis memoizado de una consulta ya normalizada (strip + minúsculas)."""
     # Detectar si hay frase de desglose
-    has_breakdown = False
-    breakdown_phrase = ""
-    
-    for prep in BREAKDOWN_PREPOSITIONS:
-        pattern = rf'\b{prep}\b\s+(\w+)'
-        match = re.search(pattern, query_lower)
-        if match:
-            has_breakdown = True
-            breakdown_phrase = match.group(0)
-            break
+    match = _BREAKDOWN_PHRASE_RE.search(query_lower)
+    has_breakdown = match is not None
+    breakdown_phrase = match.group(0) if match else ""
     
     # Detectar dimensiones
-    dimensions, dimension_types = detect_dimensions(query_lower)
-    
-    # Construir query limpia (sin dimensiones)
-    indicator_query = query_lower
-    
-    # Remover frases de desglose
-    for prep in BREAKDOWN_PREPOSITIONS:
-        for dim in dimensions:
-            patterns = [
-                rf'\b{prep}\s+{dim}\b',
-                rf'\b{prep}\s+\w*{dim}\w*\b',
-            ]
-            for pattern in patterns:
-                indicator_query = re.sub(pattern, '', indicator_query)
+    dimensions, dimension_types = _detect_dimensions_lower(query_lower)
     
-    # Remover dimensiones sueltas
-    for dim in dimensions:
-        indicator_query = re.sub(rf'\b{dim}\b', '', indicator_query)
+    # Construir query limpia (sin dimensiones): frases de desglose y dimensiones sueltas
+    indicator_query = _BREAKDOWN_DIM_RE.sub('', query_lower)
+    indicator_query = _BARE_DIM_RE.sub('', indicator_query)
     
     # Limpiar espacios extra
     indicator_query = ' '.join(indicator_query.split()).strip()
     
     return QueryAnalysis(
-        original_query=original,
+        original_query=query_lower,
         indicator_query=indicator_query,
-        dimensions=dimensions,
-        dimension_types=dimension_types,
+        dimensions=tuple(dimensions),
+        dimension_types=frozenset(dimension_types),
         has_breakdown=has_breakdown,
         breakdown_phrase=breakdown_phrase
     )
 
 
+def clear_analysis_cache() -> None:
+    """Vacía el cache de análisis de consultas (p. ej. entre tests)."""
+    _analyze_normalized_query.cache_clear()
+
+
 # =============================================================================
 # DIMENSIONES DISPONIBLES POR INDICADOR
 # =============================================================================
@@ -188,29 +229,47 @@ INDICATOR_DIMENSIONS = {
 }
 
 
-def get_available_dimensions(indicator_code: str) -> Dict[str, List[str]]:
+# Dimensiones genéricas para indicadores sin mapeo estático
+_DEFAULT_DIMENSIONS = MappingProxyType({
+    'GEOGRAPHICAL': ('isla', 'municipio'),
+    'SEX': ('hombres', 'mujeres'),
+    'AGE': ('grupos de edad',),
+})
+
+
+@lru_cache(maxsize=128)
+def get_available_dimensions(indicator_code: str) -> Mapping[str, Tuple[str, ...]]:
     """Obtiene las dimensiones disponibles para un indicador.
     
     Args:
         indicator_code: Código del indicador
         
     Returns:
-        Diccionario con tipos de dimensión y valores disponibles.
+        Vista de solo lectura con tipos de dimensión y valores disponibles.
     """
     # Primero buscar en mapeo estático
     if indicator_code in INDICATOR_DIMENSIONS:
-        return INDICATOR_DIMENSIONS[indicator_code]
+        return MappingProxyType({
+            dim_type: tuple(values)
+            for dim_type, values in INDICATOR_DIMENSIONS[indicator_code].items()
+        })
     
     # TODO: Obtener dinámicamente desde get_indicator_info
     # Por ahora, devolver dimensiones genéricas
-    return {
-        'GEOGRAPHICAL': ['isla', 'municipio'],
-        'SEX': ['hombres', 'mujeres'],
-        'AGE': ['grupos de edad'],
-    }
+    return _DEFAULT_DIMENSIONS
+
 
+# Nombres legibles de los tipos de dimensión
+_TYPE_NAMES = _freeze({
+    'GEOGRAPHICAL': 'Territorio',
+    'SEX': 'Sexo',
+    'AGE': 'Edad',
+    'TIME': 'Periodo',
+    'NATIONALITY': 'Nacionalidad',
+})
 
-def format_dimensions_message(indicator_code: str, dimensions: Dict[str, List[str]]) -> str:
+
+def format_dimensions_message(indicator_code: str, dimensions: Mapping[str, Sequence[str]]) -> str:
     """Formatea un mensaje explicando las dimensiones disponibles.
     
     Args:
@@ -225,16 +284,8 @@ def format_dimensions_message(indicator_code: str, dimensions: Dict[str, List[st
         ""
     ]
     
-    type_names = {
-        'GEOGRAPHICAL': 'Territorio',
-        'SEX': 'Sexo',
-        'AGE': 'Edad',
-        'TIME': 'Periodo',
-        'NATIONALITY': 'Nacionalidad',
-    }
-    
     for dim_type, values in dimensions.items():
-        type_name = type_names.get(dim_type, dim_type)
+        type_name = _TYPE_NAMES.get(dim_type, dim_type)
         values_str = ', '.join(values)
         lines.append(f"• **{type_name}**: {values_str}")
     
@@ -304,7 +355,7 @@ MUNICIPIOS_POR_ISLA = {
 }
 
 # Islas de Canarias con sus códigos (múltiples formatos)
-ISLAS_CANARIAS = {
+ISLAS_CANARIAS = _freeze({
     # nombre_normalizado: (nombre_oficial, código_NUTS3, prefijo_municipios)
     'tenerife': ('Tenerife', 'ES706', '38'),
     'gran canaria': ('Gran Canaria', 'ES703', '35'),
@@ -320,19 +371,29 @@ ISLAS_CANARIAS = {
     'hierro': ('El Hierro', 'ES709', '38'),
     'la graciosa': ('La Graciosa', 'ES705', '35'),  # En Lanzarote
     'canarias': ('Canarias', 'ES70', None),
-}
+})
+
+
+def _normalize_place_name(text: str) -> str:
+    """Normaliza un topónimo: minúsculas, sin tildes ni espacios."""
+    ascii_text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return ascii_text.lower().replace(' ', '')
+
+
+# ISLAS_CANARIAS indexado por nombre normalizado ("Gran Canaria" = "grancanaria")
+_ISLAS_NORM = {_normalize_place_name(k): v for k, v in ISLAS_CANARIAS.items()}
 
 # Valores de sexo
-SEXO_VALUES = {
+SEXO_VALUES = _freeze({
     'total': ('Total', 'TOTAL'),
     'hombre': ('Hombres', 'MALE'),
     'hombres': ('Hombres', 'MALE'),
     'mujer': ('Mujeres', 'FEMALE'),
     'mujeres': ('Mujeres', 'FEMALE'),
-}
+})
 
 # Granularidades geográficas para la API
-GEO_GRANULARITIES = {
+GEO_GRANULARITIES = _freeze({
     'isla': 'ISLANDS',
     'islas': 'ISLANDS',
     'municipio': 'MUNICIPALITIES',
@@ -344,10 +405,10 @@ GEO_GRANULARITIES = {
     'region': 'REGIONS',
     'comunidad': 'REGIONS',
     'canarias': 'REGIONS',
-}
+})
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DimensionValue:
     """Valor de dimensión resuelto."""
     dimension_type: str    # GEOGRAPHICAL, SEX, etc.
@@ -366,30 +427,30 @@ def resolve_island(text: str) -> Optional[DimensionValue]:
     Returns:
         DimensionValue o None si no es una isla.
     """
-    text_lower = text.lower().strip()
+    normalized = _normalize_place_name(text)
+    if not normalized:
+        return None
     
-    if text_lower in ISLAS_CANARIAS:
-        name, code, _ = ISLAS_CANARIAS[text_lower]
-        return DimensionValue(
-            dimension_type='GEOGRAPHICAL',
-            user_input=text,
-            resolved_name=name,
-            api_code=code,
-            is_valid=True
-        )
+    island = _ISLAS_NORM.get(normalized)
     
     # Buscar parcial
-    for key, (name, code, _) in ISLAS_CANARIAS.items():
-        if text_lower in key or key in text_lower:
-            return DimensionValue(
-                dimension_type='GEOGRAPHICAL',
-                user_input=text,
-                resolved_name=name,
-                api_code=code,
-                is_valid=True
-            )
-    
-    return None
+    if island is None:
+        for key, value in _ISLAS_NORM.items():
+            if normalized in key or key in normalized:
+                island = value
+                break
+    
+    if island is None:
+        return None
+    
+    name, code, _ = island
+    return DimensionValue(
+        dimension_type='GEOGRAPHICAL',
+        user_input=text,
+        resolved_name=name,
+        api_code=code,
+        is_valid=True
+    )
 
 
 def resolve_sex(text: str) -> Optional[DimensionValue]:
@@ -401,10 +462,11 @@ def resolve_sex(text: str) -> Optional[DimensionValue]:
     Returns:
         DimensionValue o None.
     """
-    text_lower = text.lower().strip()
+    text_lower = text.strip().lower()
     
-    if text_lower in SEXO_VALUES:
-        name, code = SEXO_VALUES[text_lower]
+    sex = SEXO_VALUES.get(text_lower)
+    if sex:
+        name, code = sex
         return DimensionValue(
             dimension_type='SEX',
             user_input=text,
@@ -425,8 +487,7 @@ def resolve_geo_granularity(text: str) -> Optional[str]:
     Returns:
         Código de granularidad para la API (ej: "ISLANDS")
     """
-    text_lower = text.lower().strip()
-    return GEO_GRANULARITIES.get(text_lower)
+    return GEO_GRANULARITIES.get(text.strip().lower())
 
 
 def resolve_dimension_value(text: str) -> Optional[DimensionValue]:
@@ -451,15 +512,17 @@ def resolve_dimension_value(text: str) -> Optional[DimensionValue]:
     return None
 
 
-def format_islands_list() -> str:
-    """Formatea lista de islas para mostrar al usuario."""
-    islands = [
+# Lista de islas ya formateada (el texto no depende de la entrada)
+_ISLANDS_LIST_STR = "\n".join([
+    "Islas de Canarias disponibles:",
+    "",
+    *(f"{i}) {island}" for i, island in enumerate([
         "Tenerife", "Gran Canaria", "Lanzarote", "Fuerteventura",
         "La Palma", "La Gomera", "El Hierro", "La Graciosa"
-    ]
-    
-    lines = ["Islas de Canarias disponibles:", ""]
-    for i, island in enumerate(islands, 1):
-        lines.append(f"{i}) {island}")
-    
-    return "\n".join(lines)
+    ], 1)),
+])
+
+
+def format_islands_list() -> str:
+    """Formatea lista de islas para mostrar al usuario."""
+    return _ISLANDS_LIST_STR
@@ -4,15 +4,30 @@ Este módulo mantiene un cache de indicadores conocidos para validar
 que los códigos usados por el LLM realmente existen.
 """
 
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
+import csv
+import pickle
 import threading
+import unicodedata
 from dataclasses import dataclass, field
 from difflib import get_close_matches
+from functools import lru_cache
+from pathlib import Path
 
-from ..config import logger
+try:
+    from rapidfuzz import fuzz, process as fuzz_process
+except ImportError:  # rapidfuzz es opcional: se usa difflib
+    fuzz_process = None
 
+from ..config import CACHE_PATH, logger
 
-@dataclass
+
+def _trigrams(text: str) -> Set[str]:
+    """Trigramas (subcadenas de 3 caracteres) de un texto."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+@dataclass(slots=True)
 class IndicatorInfo:
     """Información básica de un indicador."""
     code: str
@@ -29,26 +44,49 @@ class IndicatorCache:
     
     def __init__(self):
         self._indicators: Dict[str, IndicatorInfo] = {}
-        self._codes: Set[str] = set()
+        # Índice de búsqueda (SoA): campos en minúsculas alineados con _infos
+        self._infos: List[IndicatorInfo] = []
+        self._codes_lc: List[str] = []
+        self._titles_lc: List[str] = []
+        self._subjects_lc: List[str] = []
+        # Índice invertido de trigramas de código para find_similar()
+        self._trigram_index: Dict[str, Set[str]] = {}
+        self._short_codes: Tuple[str, ...] = ()  # Códigos sin trigramas (< 3 caracteres)
+        self._code_positions: Dict[str, int] = {}
+        self._codes_tuple: Tuple[str, ...] = ()
         self._loaded = False
         self._from_tsv = False  # Si cargó desde TSV, es inmutable
         self._lock = threading.Lock()
     
     @staticmethod
+    @lru_cache(maxsize=4096)
     def normalize_code(code: str) -> str:
-        """Normaliza un código de indicador.
+        """Normaliza un código de indicador (memoizado).
         
         Quita tildes, convierte a mayúsculas.
         POBLACIÓN → POBLACION
         """
-        import unicodedata
-        
         # Quitar tildes
         normalized = unicodedata.normalize('NFD', code)
         normalized = ''.join(c for c in normalized if unicodedata.category(c) != 'Mn')
         
         return normalized.upper().strip()
     
+    @classmethod
+    def build_infos(cls, indicators: List[Dict]) -> Dict[str, IndicatorInfo]:
+        """Normaliza una lista de indicadores a {código: IndicatorInfo}.
+        
+        Args:
+            indicators: Lista de indicadores con 'code', 'title', 'subject'
+        """
+        # Construir el lote en una sola pasada
+        normalize = cls.normalize_code
+        return {
+            code: IndicatorInfo(code, ind.get("title", ""), ind.get("subject", ""))
+            for ind in indicators
+            if (code := normalize(ind.get("code", "")))
+        }
+    
     def load(self, indicators: List[Dict], from_tsv: bool = False) -> None:
         """Carga indicadores en el cache.
         
@@ -56,27 +94,54 @@ class IndicatorCache:
             indicators: Lista de indicadores con 'code', 'title', 'subject'
             from_tsv: Si True, marca como carga desde TSV (inmutable)
         """
+        # Camino rápido sin lock: la lectura de un bool es atómica
+        if self._from_tsv and not from_tsv:
+            logger.debug("Cache ya cargado desde TSV, ignorando carga parcial")
+            return
+        
+        self.load_infos(self.build_infos(indicators), from_tsv=from_tsv)
+    
+    def load_infos(self, infos: Dict[str, IndicatorInfo], from_tsv: bool = False) -> None:
+        """Carga indicadores ya normalizados (ver build_infos).
+        
+        Args:
+            infos: Diccionario {código normalizado: IndicatorInfo}
+            from_tsv: Si True, marca como carga desde TSV (inmutable)
+        """
+        # Camino rápido sin lock: la lectura de un bool es atómica
+        if self._from_tsv and not from_tsv:
+            logger.debug("Cache ya cargado desde TSV, ignorando carga parcial")
+            return
+        
         with self._lock:
-            # Si ya cargamos desde TSV, no sobrescribir
+            # Revalidar dentro del lock (double-checked locking)
             if self._from_tsv and not from_tsv:
                 logger.debug("Cache ya cargado desde TSV, ignorando carga parcial")
                 return
             
-            for ind in indicators:
-                code_raw = ind.get("code", "")
-                code = self.normalize_code(code_raw)
-                if code:
-                    self._indicators[code] = IndicatorInfo(
-                        code=code,
-                        title=ind.get("title", ""),
-                        subject=ind.get("subject", "")
-                    )
-                    self._codes.add(code)
+            # Fusionar el lote de golpe
+            self._indicators.update(infos)
             
+            self._rebuild_search_index()
             self._loaded = True
             if from_tsv:
                 self._from_tsv = True
-            logger.info(f"Cache cargado con {len(self._codes)} indicadores")
+            logger.info(f"Cache cargado con {len(self._indicators)} indicadores")
+    
+    def _rebuild_search_index(self) -> None:
+        """Precalcula los índices usados por search() y find_similar()."""
+        self._infos = list(self._indicators.values())
+        self._codes_lc = [info.code.lower() for info in self._infos]
+        self._titles_lc = [info.title.lower() for info in self._infos]
+        self._subjects_lc = [info.subject.lower() for info in self._infos]
+        
+        self._codes_tuple = tuple(self._indicators)
+        self._code_positions = {code: i for i, code in enumerate(self._codes_tuple)}
+        self._short_codes = tuple(code for code in self._codes_tuple if len(code) < 3)
+        self._trigram_index = {}
+        for code in self._codes_tuple:
+            for trigram in _trigrams(code):
+                self._trigram_index.setdefault(trigram, set()).add(code)
     
     def is_loaded(self) -> bool:
         """Verifica si el cache está cargado."""
@@ -91,19 +156,23 @@ class IndicatorCache:
         Returns:
             True si el código existe en el cache.
         """
-        normalized = self.normalize_code(code)
-        return normalized in self._codes
+        # Camino rápido: ASCII en mayúsculas sin espacios en los extremos ya
+        # está normalizado (caso habitual de los códigos que genera el LLM)
+        if (code and code.isascii() and code.isupper()
+                and not code[0].isspace() and not code[-1].isspace()):
+            return code in self._indicators
+        return self.normalize_code(code) in self._indicators
     
     def get_info(self, code: str) -> Optional[IndicatorInfo]:
         """Obtiene información de un indicador.
         
         Args:
-            code: Código del indicador
+            code: Código del indicador (normalizado automáticamente)
             
         Returns:
             IndicatorInfo o None si no existe.
         """
-        return self._indicators.get(code.upper())
+        return self._indicators.get(self.normalize_code(code))
     
     def find_similar(self, code: str, limit: int = 5) -> List[IndicatorInfo]:
         """Busca indicadores similares a un código dado.
@@ -119,20 +188,45 @@ class IndicatorCache:
         """
         code_upper = code.upper()
         
+        # Candidatos: códigos que comparten algún trigrama con la consulta.
+        # Cualquier código que contenga a la consulta (o esté contenido en ella)
+        # comparte sus trigramas, salvo los códigos cortos que se añaden aparte.
+        query_trigrams = _trigrams(code_upper)
+        if query_trigrams:
+            candidate_set = set(self._short_codes)
+            for trigram in query_trigrams:
+                candidate_set.update(self._trigram_index.get(trigram, ()))
+            candidates = sorted(candidate_set, key=self._code_positions.__getitem__)
+        else:
+            # Consulta demasiado corta para trigramas: revisar todos
+            candidates = self._codes_tuple
+        
         # Primero buscar por match parcial en código
-        matches = []
-        for known_code in self._codes:
-            if code_upper in known_code or known_code in code_upper:
-                matches.append(self._indicators[known_code])
+        matches = [
+            self._indicators[known_code]
+            for known_code in candidates
+            if code_upper in known_code or known_code in code_upper
+        ]
         
-        # Si no hay matches, usar difflib
+        # Si no hay matches, similitud difusa (sobre los candidatos si los hay)
         if not matches:
-            similar_codes = get_close_matches(
-                code_upper, 
-                list(self._codes), 
-                n=limit, 
-                cutoff=0.4
-            )
+            choices = candidates or self._codes_tuple
+            if fuzz_process is not None:
+                hits = fuzz_process.extract(
+                    code_upper,
+                    choices,
+                    scorer=fuzz.ratio,
+                    limit=limit,
+                    score_cutoff=40
+                )
+                similar_codes = [c for c, _, _ in hits]
+            else:
+                similar_codes = get_close_matches(
+                    code_upper, 
+                    choices, 
+                    n=limit, 
+                    cutoff=0.4
+                )
             matches = [self._indicators[c] for c in similar_codes]
         
         return matches[:limit]
@@ -157,20 +251,19 @@ class IndicatorCache:
         query_upper = query.upper().strip()
         results = []
         
-        for info in self._indicators.values():
-            title_lower = info.title.lower()
-            code_upper = info.code.upper()
-            
+        for info, code_lower, title_lower, subject_lower in zip(
+            self._infos, self._codes_lc, self._titles_lc, self._subjects_lc
+        ):
             if (query_lower in title_lower or 
-                query_lower in code_upper.lower() or
-                query_lower in info.subject.lower()):
+                query_lower in code_lower or
+                query_lower in subject_lower):
                 
                 # Calcular score de relevancia (menor = mejor)
                 if title_lower == query_lower:
                     score = 0  # Coincidencia exacta de título
                 elif title_lower.startswith(query_lower + ".") or title_lower.startswith(query_lower + " "):
                     score = 1  # Título empieza con query
-                elif code_upper == query_upper or code_upper.startswith(query_upper):
+                elif info.code == query_upper or info.code.startswith(query_upper):
                     score = 2  # Código exacto o empieza con query
                 else:
                     score = 10 + len(info.title)  # Otros, títulos más cortos primero
@@ -184,11 +277,11 @@ class IndicatorCache:
     
     def all_codes(self) -> List[str]:
         """Devuelve todos los códigos conocidos."""
-        return list(self._codes)
+        return list(self._indicators)
     
     def count(self) -> int:
         """Número de indicadores en cache."""
-        return len(self._codes)
+        return len(self._indicators)
 
 
 # =============================================================================
@@ -197,6 +290,10 @@ class IndicatorCache:
 
 _cache: Optional[IndicatorCache] = None
 
+# Serializa las cargas para que varios hilos no lean el TSV/API a la vez.
+# Reentrante: load_cache_from_tsv recurre a load_cache_from_api como fallback.
+_load_lock = threading.RLock()
+
 def get_cache() -> IndicatorCache:
     """Obtiene la instancia singleton del cache."""
     global _cache
@@ -217,13 +314,18 @@ def load_cache_from_api() -> IndicatorCache:
     if cache.is_loaded():
         return cache
     
-    try:
-        client = get_client()
-        # Cargar todos los indicadores (hasta 500)
-        indicators = client.search_indicators("", limit=500)
-        cache.load(indicators)
-    except Exception as e:
-        logger.error(f"Error cargando cache: {e}")
+    with _load_lock:
+        # Otro hilo pudo completar la carga mientras esperábamos
+        if cache.is_loaded():
+            return cache
+        
+        try:
+            client = get_client()
+            # Cargar todos los indicadores (hasta 500)
+            indicators = client.search_indicators("", limit=500)
+            cache.load(indicators)
+        except Exception as e:
+            logger.error(f"Error cargando cache: {e}")
     
     return cache
 
@@ -240,53 +342,91 @@ def load_cache_from_tsv(filepath: str = None) -> IndicatorCache:
     Returns:
         Cache cargado.
     """
-    import csv
-    from pathlib import Path
-    
     cache = get_cache()
     if cache.is_loaded():
         return cache
     
-    # Ruta por defecto
-    if filepath is None:
-        # Buscar en la raíz del proyecto
-        project_root = Path(__file__).parent.parent.parent
-        filepath = project_root / "tests" / "Indicadores_actuales.tsv"
+    with _load_lock:
+        # Otro hilo pudo completar la carga mientras esperábamos
+        if cache.is_loaded():
+            return cache
+        
+        # Ruta por defecto
+        if filepath is None:
+            # Buscar en la raíz del proyecto
+            project_root = Path(__file__).parent.parent.parent
+            filepath = project_root / "tests" / "Indicadores_actuales.tsv"
     
-    filepath = Path(filepath)
-    if not filepath.exists():
-        logger.warning(f"Archivo TSV no encontrado: {filepath}")
-        return load_cache_from_api()  # Fallback a API
+        filepath = Path(filepath)
+        if not filepath.exists():
+            logger.warning(f"Archivo TSV no encontrado: {filepath}")
+            return load_cache_from_api()  # Fallback a API
     
-    try:
-        indicators = []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f, delimiter='\t')
-            for row in reader:
-                code = row.get('code', '').strip()
-                title = row.get('production-title#es', '').strip()
-                if code and code.upper() != 'CODE':  # Ignorar header
-                    indicators.append({
-                        'code': code,
-                        'title': title,
-                        'subject': ''
-                    })
+        try:
+            infos = _read_tsv_cached(filepath)
         
-        if indicators:
-            # Marcar como carga desde TSV (inmutable)
-            cache.load(indicators, from_tsv=True)
-            logger.info(f"Cache cargado desde TSV con {len(indicators)} indicadores")
-        else:
-            logger.warning("TSV vacío, cargando desde API")
-            return load_cache_from_api()
+            if infos:
+                # Marcar como carga desde TSV (inmutable)
+                cache.load_infos(infos, from_tsv=True)
+                logger.info(f"Cache cargado desde TSV con {len(infos)} indicadores")
+            else:
+                logger.warning("TSV vacío, cargando desde API")
+                return load_cache_from_api()
             
-    except Exception as e:
-        logger.error(f"Error cargando TSV: {e}")
-        return load_cache_from_api()
+        except Exception as e:
+            logger.error(f"Error cargando TSV: {e}")
+            return load_cache_from_api()
     
     return cache
 
 
+def _parse_tsv(filepath: Path) -> Dict[str, IndicatorInfo]:
+    """Parsea el TSV de indicadores exportado del ISTAC."""
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f, delimiter='\t')
+        # Localizar las columnas una vez y acceder a las filas por índice
+        header = next(reader, [])
+        ci = header.index('code')
+        ti = header.index('production-title#es')
+        width = max(ci, ti)
+        indicators = [
+            {'code': row[ci].strip(), 'title': row[ti].strip(), 'subject': ''}
+            for row in reader
+            if len(row) > width and row[ci].strip()
+        ]
+    return IndicatorCache.build_infos(indicators)
+
+
+def _read_tsv_cached(filepath: Path) -> Dict[str, IndicatorInfo]:
+    """Lee el TSV usando un sidecar pickle invalidado por ruta, mtime y tamaño.
+    
+    Evita reparsear y normalizar el TSV en cada arranque. Cualquier fallo
+    del cache (corrupto, sin permisos) cae al parseo normal del TSV.
+    """
+    stat = filepath.stat()
+    key = (str(filepath.resolve()), stat.st_mtime_ns, stat.st_size)
+    sidecar = CACHE_PATH / f'{filepath.stem}.indicators.pkl'
+    
+    try:
+        with open(sidecar, 'rb') as f:
+            cached_key, infos = pickle.load(f)
+        if cached_key == key:
+            return infos
+    except Exception:
+        pass
+    
+    infos = _parse_tsv(filepath)
+    
+    try:
+        CACHE_PATH.mkdir(parents=True, exist_ok=True)
+        with open(sidecar, 'wb') as f:
+            pickle.dump((key, infos), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+    
+    return infos
+
+
 def ensure_cache_loaded() -> IndicatorCache:
     """Asegura que el cache esté cargado, preferentemente desde TSV.
     
@@ -294,7 +434,11 @@ def ensure_cache_loaded() -> IndicatorCache:
         Cache cargado.
     """
     cache = get_cache()
-    if not cache.is_loaded():
-        # Intentar primero desde TSV (más confiable)
-        cache = load_cache_from_tsv()
+    if cache.is_loaded():
+        return cache
+    
+    with _load_lock:
+        if not cache.is_loaded():
+            # Intentar primero desde TSV (más confiable)
+            cache = load_cache_from_tsv()
     return cache
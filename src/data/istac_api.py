@@ -19,11 +19,25 @@ APIs soportadas:
 from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
+import numpy as np
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:  # orjson es opcional: se usa response.json()
+    orjson = None
+
+try:
+    from requests_cache import CachedSession
+except ImportError:  # requests-cache es opcional: sin cache HTTP
+    CachedSession = None
+
 from ..policies import DataTraceability
-from ..config import get as get_config, logger
+from ..config import CACHE_PATH, get as get_config, logger
+from ._cache import cached_metadata, singleflight
 
 
 # =============================================================================
@@ -45,6 +59,76 @@ API_ENDPOINTS = {
     "catalog": "/catalogo",
 }
 
+# Pool de conexiones y reintentos del Session HTTP
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+STRUCTURE_CACHE_SIZE = 64  # Estructuras de dimensiones memorizadas por cliente
+
+# Fichas y listados de metadatos (memoria + disco, storage.cache_ttl_hours)
+_cached_metadata = cached_metadata(CACHE_PATH / 'istac_api')
+# Catálogos casi inmutables (temáticas, clasificaciones, operaciones)
+_cached_catalog = cached_metadata(
+    CACHE_PATH / 'istac_api', 'storage.catalog_cache_ttl_hours', 168
+)
+
+
+# =============================================================================
+# ESTRUCTURA DE DATOS SDMX
+# =============================================================================
+
+@dataclass(frozen=True, eq=False)
+class IndicatorStructure:
+    """Estructura de dimensiones de una respuesta de datos.
+    
+    Se deriva solo de los metadatos ('dimension' y 'format'), así que
+    puede reutilizarse entre descargas del mismo indicador y filtro.
+    """
+    format_order: Tuple[str, ...]
+    sizes: np.ndarray       # Tamaño de cada dimensión
+    strides: np.ndarray     # Paso de cada dimensión en el índice lineal
+    labels: Tuple[np.ndarray, ...]  # posición → código, por dimensión
+
+
+def _parse_structure(dimensions: Dict, format_order: List[str]) -> IndicatorStructure:
+    """Invierte los índices de dimensión y calcula tamaños y strides."""
+    sizes = []
+    labels = []
+    for dim_name in format_order:
+        rep = dimensions.get(dim_name, {}).get("representation", {})
+        size = rep.get("size", 1)
+        # Invertir: código → posición  =>  posición → código
+        lookup = {v: k for k, v in rep.get("index", {}).items()}
+        sizes.append(size)
+        labels.append(np.array(
+            [lookup.get(pos, str(pos)) for pos in range(size)],
+            dtype=object
+        ))
+    
+    # Strides row-major: idx[i, j] = (i // stride_j) % size_j
+    sizes = np.asarray(sizes, dtype=np.int64)
+    strides = np.ones_like(sizes)
+    if len(sizes) > 1:
+        strides[:-1] = np.cumprod(sizes[::-1])[::-1][1:]
+    
+    return IndicatorStructure(
+        format_order=tuple(format_order),
+        sizes=sizes,
+        strides=strides,
+        labels=tuple(labels),
+    )
+
+
+def _is_float(value: Any) -> bool:
+    """Indica si float() acepta el valor (los vacíos cuentan: son NaN)."""
+    if not value:
+        return True
+    try:
+        float(value)
+        return True
+    except (ValueError, TypeError):
+        return False
+
 
 # =============================================================================
 # CLIENTE PRINCIPAL
@@ -56,19 +140,75 @@ class ISTACApi:
     def __init__(self, base_url: str = BASE_URL, timeout: int = 30):
         self.base_url = base_url
         self.timeout = timeout
-        self.session = requests.Session()
+        self.session = self._create_session()
         self.session.headers.update({
             "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
             "User-Agent": "ISTAC-Assistant/1.0"
         })
+        
+        # Reutilizar conexiones TCP/TLS y reintentar errores transitorios.
+        # raise_on_status=False: tras agotar reintentos se devuelve la última
+        # respuesta y raise_for_status() sigue lanzando HTTPError como antes.
+        retry = Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=RETRY_STATUS_CODES,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            max_retries=retry,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        # Estructuras de dimensiones ya parseadas (ver _get_structure)
+        self._structures: Dict[Tuple, IndicatorStructure] = {}
+    
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """Crea el Session HTTP, con cache de respuestas GET si está disponible.
+        
+        Con requests-cache instalado y istac.http_cache_ttl_seconds > 0, las
+        respuestas GET se guardan en SQLite (.cache/istac_http.sqlite).
+        Desactivado por defecto: también cachearía datos e is_available().
+        """
+        ttl = get_config("istac.http_cache_ttl_seconds", 0)
+        if CachedSession is None or not ttl:
+            return requests.Session()
+        
+        CACHE_PATH.mkdir(parents=True, exist_ok=True)
+        return CachedSession(
+            str(CACHE_PATH / "istac_http"),
+            backend="sqlite",
+            expire_after=ttl,
+            allowable_methods=("GET",),
+        )
     
     def _request(self, endpoint: str, params: Optional[Dict] = None) -> Dict:
-        """Realiza una petición GET a la API."""
+        """Realiza una petición GET a la API.
+        
+        Las peticiones idénticas simultáneas (p. ej. herramientas del LLM en
+        paralelo) comparten una única llamada de red y su respuesta.
+        """
         url = f"{self.base_url}{endpoint}"
+        key = (url, tuple(sorted(params.items())) if params else ())
+        return singleflight(key, lambda: self._fetch_json(url, params))
+    
+    def _fetch_json(self, url: str, params: Optional[Dict]) -> Dict:
+        """GET y decodificación JSON de una URL completa."""
         try:
             response = self.session.get(url, params=params, timeout=self.timeout)
             response.raise_for_status()
-            return response.json()
+            if orjson is None:
+                return response.json()
+            try:
+                return orjson.loads(response.content)
+            except orjson.JSONDecodeError as e:
+                # Mismo tipo de error que lanzaría response.json()
+                raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos) from e
         except requests.exceptions.RequestException as e:
             logger.error(f"Error en petición a {url}: {e}")
             raise
@@ -81,12 +221,15 @@ class ISTACApi:
             # Formato: {"__default__": "texto"} o {"text": [{"lang": "es", "value": "..."}]}
             if "__default__" in text_obj:
                 return text_obj["__default__"]
-            if "text" in text_obj and isinstance(text_obj["text"], list):
-                for t in text_obj["text"]:
+            texts = text_obj.get("text")
+            if isinstance(texts, list) and texts:
+                # Una sola traducción: es la pedida o el fallback, da igual
+                if len(texts) == 1:
+                    return texts[0].get("value", "")
+                for t in texts:
                     if t.get("lang") == lang:
                         return t.get("value", "")
-                if text_obj["text"]:
-                    return text_obj["text"][0].get("value", "")
+                return texts[0].get("value", "")
         return str(text_obj) if text_obj else ""
 
     # =========================================================================
@@ -106,21 +249,10 @@ class ISTACApi:
         data = self._request(endpoint, params)
         
         items = data.get("items", [])
+        if not query:
+            items = items[:limit]  # Sin filtro: solo localizar lo que se devuelve
         
-        # Filtrar por texto en título si hay query
-        if query:
-            query_lower = query.lower()
-            items = [
-                item for item in items
-                if query_lower in self._get_localized_text(item.get("title", {})).lower()
-                or query_lower in self._get_localized_text(item.get("subjectTitle", {})).lower()
-                or query_lower in item.get("code", "").lower()
-            ]
-        
-        # Limitar resultados
-        items = items[:limit]
-        
-        return [
+        results = [
             {
                 "code": item.get("code", ""),
                 "title": self._get_localized_text(item.get("title", {})),
@@ -128,7 +260,20 @@ class ISTACApi:
             }
             for item in items
         ]
+        
+        # Filtrar por texto en título, temática o código si hay query:
+        # una sola búsqueda sobre los tres campos unidos con un separador
+        if query:
+            query_lower = query.lower()
+            results = [
+                r for r in results
+                if query_lower in f"{r['title']}\x1f{r['subject']}\x1f{r['code']}".lower()
+            ]
+        
+        # Limitar resultados
+        return results[:limit]
     
+    @_cached_metadata
     def get_indicator(self, code: str) -> Optional[Dict]:
         """Obtiene información detallada de un indicador."""
         endpoint = f"{API_ENDPOINTS['indicators']}/indicators/{code}"
@@ -174,9 +319,15 @@ class ISTACApi:
         code: str,
         geo: Optional[str] = None,
         time: Optional[str] = None,
-        measure: str = "ABSOLUTE"
+        measure: str = "ABSOLUTE",
+        limit: Optional[int] = None
     ) -> Tuple[Optional[pd.DataFrame], Optional[DataTraceability]]:
-        """Obtiene datos de un indicador con filtros."""
+        """Obtiene datos de un indicador con filtros.
+        
+        La API devuelve siempre el cubo completo. Con limit solo se
+        decodifican las primeras observaciones; el total queda en
+        df.attrs["total_rows"].
+        """
         
         # Construir representación
         rep_parts = []
@@ -207,51 +358,38 @@ class ISTACApi:
         if not observations:
             return None, None
         
-        # Invertir índices: posición → código
-        dim_maps = {}
-        for dim_name, dim_info in dimensions.items():
-            rep = dim_info.get("representation", {})
-            index_map = rep.get("index", {})
-            # Invertir: código → posición  =>  posición → código
-            dim_maps[dim_name] = {v: k for k, v in index_map.items()}
+        structure = self._get_structure(code, params, dimensions, format_order)
         
-        # Calcular tamaños de cada dimensión para descomponer índice lineal
-        dim_sizes = []
-        for dim_name in format_order:
-            rep = dimensions.get(dim_name, {}).get("representation", {})
-            dim_sizes.append(rep.get("size", 1))
-        
-        # Construir filas
-        rows = []
-        for i, obs_value in enumerate(observations):
-            row = {}
-            
-            # Descomponer índice lineal en índices por dimensión
-            remaining = i
-            indices = []
-            for size in reversed(dim_sizes):
-                indices.insert(0, remaining % size)
-                remaining //= size
-            
-            # Mapear índices a códigos
-            for j, dim_name in enumerate(format_order):
-                if j < len(indices):
-                    pos = indices[j]
-                    code_val = dim_maps.get(dim_name, {}).get(pos, str(pos))
-                    row[dim_name] = code_val
-            
-            # Valor
-            try:
-                row["value"] = float(obs_value) if obs_value else None
-            except (ValueError, TypeError):
-                row["value"] = obs_value
-            
-            rows.append(row)
+        total_rows = len(observations)
+        if limit is not None and total_rows > limit:
+            observations = observations[:limit]
         
-        if not rows:
-            return None, None
+        # Descomponer todos los índices lineales a la vez
+        idx = (
+            np.arange(len(observations))[:, None] // structure.strides
+        ) % structure.sizes
+        
+        # Construir columnas (SoA): cada dimensión indexa su array de etiquetas
+        columns = {
+            dim_name: labels[idx[:, j]]
+            for j, (dim_name, labels) in enumerate(
+                zip(structure.format_order, structure.labels)
+            )
+        }
+        
+        # Valor: conversión vectorizada; vacíos → NaN
+        values = np.asarray(
+            pd.to_numeric(observations, errors="coerce"), dtype=np.float64
+        )
+        # No numéricos (p. ej. ".."): se conserva el valor original
+        kept = [i for i in np.flatnonzero(np.isnan(values)) if not _is_float(observations[i])]
+        if kept:
+            values = values.astype(object)
+            values[kept] = [observations[i] for i in kept]
+        columns["value"] = values
         
-        df = pd.DataFrame(rows)
+        df = pd.DataFrame(columns, copy=False)
+        df.attrs["total_rows"] = total_rows
         
         # Crear trazabilidad
         traceability = DataTraceability(
@@ -265,6 +403,39 @@ class ISTACApi:
         
         return df, traceability
     
+    def _get_structure(
+        self,
+        code: str,
+        params: Dict,
+        dimensions: Dict,
+        format_order: List[str]
+    ) -> IndicatorStructure:
+        """Obtiene la estructura de dimensiones, memorizada por indicador.
+        
+        La clave usa, por dimensión, el tamaño y el primer y último código
+        del índice (O(1) cada uno, sin recorrerlo): un periodo nuevo o un
+        cambio de orden en los extremos obliga a recalcularla.
+        """
+        key = (code, params.get("representation", ""))
+        for dim_name in format_order:
+            rep = dimensions.get(dim_name, {}).get("representation", {})
+            index = rep.get("index", {})
+            key += ((
+                dim_name,
+                rep.get("size", 1),
+                next(iter(index), None),
+                next(reversed(index), None),
+            ),)
+        structure = self._structures.get(key)
+        if structure is None:
+            structure = _parse_structure(dimensions, format_order)
+            if len(self._structures) >= STRUCTURE_CACHE_SIZE:
+                # Descartar la entrada más antigua
+                self._structures.pop(next(iter(self._structures)), None)
+            self._structures[key] = structure
+        return structure
+    
+    @_cached_catalog
     def get_subjects(self) -> List[Dict]:
         """Obtiene las temáticas/categorías de indicadores."""
         endpoint = f"{API_ENDPOINTS['indicators']}/subjects"
@@ -282,6 +453,7 @@ class ISTACApi:
     # API 2: RECURSOS ESTADÍSTICOS (DATASETS/CUBOS)
     # =========================================================================
     
+    @_cached_metadata
     def list_datasets(self, limit: int = 25, query: str = "") -> List[Dict]:
         """Lista los cubos de datos disponibles."""
         endpoint = f"{API_ENDPOINTS['statistical_resources']}/datasets"
@@ -320,6 +492,7 @@ class ISTACApi:
     # API 3: RECURSOS ESTRUCTURALES (CLASIFICACIONES)
     # =========================================================================
     
+    @_cached_catalog
     def list_classifications(self, limit: int = 25) -> List[Dict]:
         """Lista las clasificaciones (codelists) disponibles."""
         endpoint = f"{API_ENDPOINTS['structural_resources']}/codelists"
@@ -355,6 +528,7 @@ class ISTACApi:
     # API 4: OPERACIONES ESTADÍSTICAS
     # =========================================================================
     
+    @_cached_catalog
     def list_operations(self, limit: int = 25) -> List[Dict]:
         """Lista las operaciones estadísticas."""
         endpoint = f"{API_ENDPOINTS['operations']}/operations"
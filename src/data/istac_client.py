@@ -6,14 +6,13 @@ para acceder a los datos del ISTAC, aplicando las políticas del sistema.
 
 from typing import Any, Dict, List, Optional, Tuple
 import pandas as pd
-
-# Importar istacpy
-from istacpy.indicators import indicators as api_indicators
-from istacpy.indicators import geographic as api_geographic
-from istacpy.indicators.lite import indicators as lite_indicators
-from istacpy.statisticalresources import cubes, queries
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .. import config
+from ._cache import cached_metadata
+from .istac_api import POOL_CONNECTIONS, POOL_MAXSIZE
 from ..policies import (
     DataTraceability,
     check_download_limit,
@@ -23,6 +22,109 @@ from ..policies import (
 )
 
 
+# Módulos de istacpy, importados en el primer uso (ver _load_istacpy)
+api_indicators = None
+api_geographic = None
+lite_indicators = None
+cubes = None
+
+# Funciones de cubos usadas en caliente, resueltas una sola vez
+_get_datasets = None
+_get_dataset = None
+_build_dataset_response = None
+
+
+def _load_istacpy() -> None:
+    """Importa istacpy la primera vez que se crea un cliente.
+    
+    istacpy y sus submódulos tardan en importarse; así importar este
+    módulo (CLI, tests) no paga ese coste hasta que se usa de verdad.
+    """
+    global api_indicators, api_geographic, lite_indicators, cubes
+    global _get_datasets, _get_dataset, _build_dataset_response
+    if cubes is not None:
+        return
+    
+    from istacpy.indicators import indicators as api_indicators
+    from istacpy.indicators import geographic as api_geographic
+    from istacpy.indicators.lite import indicators as lite_indicators
+    from istacpy.statisticalresources import cubes
+    from istacpy import services
+    
+    _get_datasets = cubes.get_statisticalresources_datasets
+    _get_dataset = cubes.get_statisticalresources_datasets_agency_resource_version
+    _build_dataset_response = services.build_resolved_api_response
+
+
+# Session HTTP compartido por todas las llamadas de istacpy
+_session: Optional[requests.Session] = None
+
+
+class _PooledRequests:
+    """Sustituto del módulo 'requests' dentro de istacpy.services.
+    
+    get() va al Session compartido; el resto de atributos (excepciones,
+    codes...) se resuelven en el módulo real.
+    """
+    
+    def __init__(self, session: requests.Session):
+        self._session = session
+    
+    def get(self, *args, **kwargs):
+        return self._session.get(*args, **kwargs)
+    
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+def _install_shared_session() -> requests.Session:
+    """Hace que istacpy reutilice conexiones keep-alive.
+    
+    istacpy llama a requests.get() (sin Session) en istacpy.services.get_content,
+    así que cada petición abre una conexión TCP+TLS nueva. Su get_content se
+    mantiene intacto (cabeceras, api-key, DEBUG); solo el nombre 'requests' de
+    ese módulo pasa a apuntar a un Session con pool y reintentos. El módulo
+    'requests' que ve el resto del proceso no se toca.
+    """
+    global _session
+    if _session is None:
+        import istacpy.services as istac_services
+        
+        session = requests.Session()
+        session.headers["Connection"] = "keep-alive"
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        )
+        session.mount("https://", HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            max_retries=retry,
+        ))
+        
+        istac_services.requests = _PooledRequests(session)
+        _session = session
+    return _session
+
+
+# Cache de metadatos (memoria + disco). Los datos no se cachean: son grandes.
+_cached_metadata = cached_metadata(config.CACHE_PATH / 'istacpy')
+
+
+def _to_arrow_backed(df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte un DataFrame a tipos respaldados por PyArrow (columnar).
+    
+    Reduce memoria en columnas de texto y acelera filtrados posteriores.
+    Si pandas o pyarrow no lo soportan, devuelve el DataFrame tal cual.
+    """
+    try:
+        return df.convert_dtypes(dtype_backend='pyarrow')
+    except (TypeError, ValueError, ImportError):
+        return df
+
+
 class ISTACClient:
     """Cliente unificado para acceder a datos del ISTAC.
     
@@ -35,6 +137,8 @@ class ISTACClient:
     def __init__(self):
         """Inicializa el cliente."""
         self.logger = config.logger
+        _load_istacpy()
+        self._session = _install_shared_session()
     
     # =========================================================================
     # INDICADORES
@@ -63,10 +167,11 @@ class ISTACClient:
                 # Listar todos
                 response = api_indicators.get_indicators(limit=limit)
                 items = response.get('items', [])
+                localize = self._get_localized_text
                 return [
                     {
                         "code": item.get('code', ''),
-                        "title": self._get_localized_text(item.get('title', {}))
+                        "title": localize(item.get('title', {}))
                     }
                     for item in items
                 ]
@@ -74,6 +179,7 @@ class ISTACClient:
             self.logger.error(f"Error buscando indicadores: {e}")
             return []
     
+    @_cached_metadata
     def get_indicator_info(self, code: str) -> Optional[Dict[str, Any]]:
         """Obtiene información detallada de un indicador.
         
@@ -120,7 +226,7 @@ class ISTACClient:
         try:
             indicator = lite_indicators.get_indicator(code)
             data = indicator.get_data(geo=geo, time=time, measure=measure)
-            df = data.as_dataframe()
+            df = _to_arrow_backed(data.as_dataframe())
             
             # Crear trazabilidad
             traceability = DataTraceability(
@@ -142,6 +248,7 @@ class ISTACClient:
     # DATASETS
     # =========================================================================
     
+    @_cached_metadata
     def list_datasets(self, limit: int = 50) -> List[Dict[str, str]]:
         """Lista los datasets disponibles.
         
@@ -152,12 +259,13 @@ class ISTACClient:
             Lista de diccionarios con id y nombre.
         """
         try:
-            response = cubes.get_statisticalresources_datasets(limit=limit)
+            response = _get_datasets(limit=limit)
             items = response.get('dataset', [])
+            localize = self._get_localized_text
             return [
                 {
                     "id": item.get('id', ''),
-                    "name": self._get_localized_text(item.get('name', {})),
+                    "name": localize(item.get('name', {})),
                     "version": item.get('version', ''),
                 }
                 for item in items
@@ -183,23 +291,19 @@ class ISTACClient:
         
         Returns:
             Tupla de (DataFrame, Trazabilidad) o (None, None) si hay error.
+            Si el dataset supera el límite de descarga, (None, Trazabilidad)
+            con el motivo del bloqueo en query_description.
         """
         try:
-            result = cubes.get_statisticalresources_datasets_agency_resource_version(
+            # Respuesta en bruto: el DataFrame solo se construye si cabe
+            response = _get_dataset(
                 agencyid=agency,
                 resourceid=resource_id,
                 version=version,
                 dim=filters or "",
-                as_dataframe=True
+                as_dataframe=False
             )
             
-            df = result.dataframe
-            
-            # Verificar límites
-            allowed, msg = check_download_limit(len(df))
-            if not allowed:
-                self.logger.warning(msg)
-            
             traceability = DataTraceability(
                 source_name=resource_id,
                 source_code=f"{agency}/{resource_id}/{version}",
@@ -209,6 +313,21 @@ class ISTACClient:
                 query_description=f"Dataset {resource_id}"
             )
             
+            # El cubo es denso: filas = producto de valores por dimensión
+            rows = 1
+            for dimension in response['data']['dimensions']['dimension']:
+                rows *= len(dimension['representations']['representation'])
+            
+            # Verificar límites antes de materializar el DataFrame
+            allowed, msg = check_download_limit(rows)
+            if not allowed:
+                self.logger.warning(msg)
+                traceability.query_description = f"Descarga bloqueada: {msg}"
+                return None, traceability
+            
+            result = _build_dataset_response(response)
+            df = _to_arrow_backed(result.dataframe)
+            
             return df, traceability
             
         except Exception as e:
@@ -219,15 +338,17 @@ class ISTACClient:
     # UTILIDADES
     # =========================================================================
     
+    @_cached_metadata
     def get_geographic_granularities(self) -> List[Dict[str, str]]:
         """Obtiene las granularidades geográficas disponibles."""
         try:
             response = api_geographic.get_indicators_geographic_granularities()
             items = response.get('items', [])
+            localize = self._get_localized_text
             return [
                 {
                     "code": item.get('code', ''),
-                    "title": self._get_localized_text(item.get('title', {}))
+                    "title": localize(item.get('title', {}))
                 }
                 for item in items
             ]
@@ -235,6 +356,7 @@ class ISTACClient:
             self.logger.error(f"Error: {e}")
             return []
     
+    @_cached_metadata
     def get_subjects(self) -> List[Dict[str, str]]:
         """Obtiene las temáticas disponibles."""
         try:
@@ -246,14 +368,14 @@ class ISTACClient:
     
     def _get_localized_text(self, text_obj: Any) -> str:
         """Extrae texto localizado de un objeto de la API."""
+        # Los items de la API traen casi siempre un dict {'__default__': ...};
+        # str(text_obj) solo se calcula si falta la clave
+        if isinstance(text_obj, dict):
+            if '__default__' in text_obj:
+                return text_obj['__default__']
+            return str(text_obj)
         if isinstance(text_obj, str):
             return text_obj
-        if isinstance(text_obj, dict):
-            return text_obj.get('__default__', str(text_obj))
-        if isinstance(text_obj, dict) and 'text' in text_obj:
-            texts = text_obj.get('text', [])
-            if texts and isinstance(texts, list):
-                return texts[0].get('value', '')
         return str(text_obj) if text_obj else ''
 
 
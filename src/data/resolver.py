@@ -5,10 +5,13 @@ inventa códigos de indicador. Convierte códigos inválidos en
 búsquedas y presenta candidatos para selección.
 """
 
-import re
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import chain
 
+from ._regex import KW_RE
 from .ids_cache import get_cache, ensure_cache_loaded, IndicatorInfo
 from ..config import logger
 
@@ -40,39 +43,19 @@ def extract_keywords(code: str) -> List[str]:
     """
     if not code:
         return []
-    
-    # Normalizar: mayúsculas, reemplazar separadores
-    normalized = code.upper()
-    
-    # Separar por guion bajo
-    parts = normalized.split('_')
-    
-    # Expandir partes que son combinaciones (SEXOEDAD → SEXO, EDAD)
-    expanded = []
-    common_prefixes = ['SEXO', 'EDAD', 'ISLA', 'MUN', 'REGION', 'HOMBRE', 'MUJER', 'TOTAL']
-    
-    for part in parts:
-        # Intentar separar palabras pegadas
-        if len(part) > 6:
-            # Buscar prefijos conocidos
-            found = False
-            for prefix in common_prefixes:
-                if part.startswith(prefix) and len(part) > len(prefix):
-                    expanded.append(prefix.lower())
-                    rest = part[len(prefix):]
-                    if rest:
-                        expanded.append(rest.lower())
-                    found = True
-                    break
-            if not found:
-                expanded.append(part.lower())
-        else:
-            expanded.append(part.lower())
-    
-    # Filtrar palabras muy cortas o números
-    keywords = [k for k in expanded if len(k) > 2 and not k.isdigit()]
-    
-    return keywords
+    return list(_extract_keywords(code))
+
+
+@lru_cache(maxsize=1024)
+def _extract_keywords(code: str) -> Tuple[str, ...]:
+    """Implementación memoizada de extract_keywords (el LLM repite códigos)."""
+    # Trocear y expandir en C; filtrar palabras muy cortas o números
+    return tuple(
+        token.lower()
+        for groups in KW_RE.findall(code.upper())
+        for token in groups
+        if len(token) > 2 and not token.isdigit()
+    )
 
 
 def resolve_indicator(
@@ -131,42 +114,51 @@ def resolve_indicator(
     )
 
 
-def format_candidates_for_selection(candidates: List[IndicatorInfo]) -> str:
+def format_candidates_for_selection(
+    candidates: Union[List[IndicatorInfo], Tuple[Sequence[str], Sequence[str]]]
+) -> str:
     """Formatea candidatos para presentar al usuario.
     
     Args:
-        candidates: Lista de candidatos
+        candidates: Lista de candidatos, o columnas paralelas (códigos, títulos)
         
     Returns:
         Texto formateado con lista numerada.
     """
-    lines = [
-        "Indicadores encontrados:",
-        ""
-    ]
-    
-    for i, c in enumerate(candidates, 1):
-        lines.append(f"{i}) {c.code:<30} - {c.title[:40]}")
-    
-    lines.extend([
-        "",
-        "Elige escribiendo:",
-        f"- el número (1–{len(candidates)}), o",
-        "- el ID exacto (por ejemplo: {})".format(candidates[0].code if candidates else "POBLACION")
-    ])
-    
-    return "\n".join(lines)
+    # Trabajar por columnas: una pasada para extraer atributos y otra para formatear
+    if isinstance(candidates, tuple):
+        codes, titles = candidates
+    else:
+        codes = [c.code for c in candidates]
+        titles = [c.title for c in candidates]
+    
+    # Un único join sobre cabecera + filas (generador) + pie, sin lista intermedia
+    return "\n".join(chain(
+        ("Indicadores encontrados:", ""),
+        (
+            f"{i}) {code:<30} - {title[:40]}"
+            for i, (code, title) in enumerate(zip(codes, titles), 1)
+        ),
+        (
+            "",
+            "Elige escribiendo:",
+            f"- el número (1–{len(codes)}), o",
+            f"- el ID exacto (por ejemplo: {codes[0] if codes else 'POBLACION'})",
+        ),
+    ))
 
 
 def validate_selection(
     selection: str, 
-    candidates: List[IndicatorInfo]
+    candidates: List[IndicatorInfo],
+    code_index: Optional[Dict[str, IndicatorInfo]] = None
 ) -> Tuple[bool, Optional[str], str]:
     """Valida una selección (número o ID).
     
     Args:
         selection: Entrada del usuario (número o ID)
         candidates: Lista de candidatos válidos
+        code_index: Índice código → candidato (opcional, ver SelectionState)
         
     Returns:
         Tupla (es_válido, id_seleccionado, mensaje)
@@ -187,9 +179,12 @@ def validate_selection(
     
     # Caso 2: Es un ID exacto
     selection_upper = selection.upper()
-    for c in candidates:
-        if c.code == selection_upper:
-            return True, c.code, f"Seleccionado: {c.code} - {c.title}"
+    if code_index is not None:
+        c = code_index.get(selection_upper)
+    else:
+        c = next((c for c in candidates if c.code == selection_upper), None)
+    if c is not None:
+        return True, c.code, f"Seleccionado: {c.code} - {c.title}"
     
     # No coincide con nada
     valid_ids = [c.code for c in candidates[:5]]
@@ -206,6 +201,11 @@ class SelectionState:
     attempts: int = 0
     max_attempts: int = 2
     context: str = ""  # Para qué se necesita el ID
+    code_index: Dict[str, IndicatorInfo] = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        # Índice código → candidato; ante duplicados gana el primero
+        self.code_index = {c.code: c for c in reversed(self.candidates)}
     
     def can_retry(self) -> bool:
         return self.attempts < self.max_attempts
@@ -214,8 +214,10 @@ class SelectionState:
         self.attempts += 1
 
 
-# Estado global de selección pendiente (por simplicidad)
-_pending_selection: Optional[SelectionState] = None
+# Selección pendiente, aislada por contexto (hilo o tarea async)
+_pending_selection: ContextVar[Optional[SelectionState]] = ContextVar(
+    'pending_selection', default=None
+)
 
 
 def start_selection(candidates: List[IndicatorInfo], context: str = "") -> str:
@@ -228,11 +230,10 @@ def start_selection(candidates: List[IndicatorInfo], context: str = "") -> str:
     Returns:
         Mensaje formateado para el usuario.
     """
-    global _pending_selection
-    _pending_selection = SelectionState(
+    _pending_selection.set(SelectionState(
         candidates=candidates,
         context=context
-    )
+    ))
     
     return format_candidates_for_selection(candidates)
 
@@ -246,38 +247,37 @@ def process_selection(user_input: str) -> Tuple[bool, Optional[str], str]:
     Returns:
         Tupla (completado, id_seleccionado, mensaje)
     """
-    global _pending_selection
-    
-    if _pending_selection is None:
+    state = _pending_selection.get()
+    if state is None:
         return False, None, "No hay selección pendiente"
     
-    _pending_selection.record_attempt()
+    state.record_attempt()
     
     valid, selected_id, message = validate_selection(
         user_input, 
-        _pending_selection.candidates
+        state.candidates,
+        state.code_index
     )
     
     if valid:
-        _pending_selection = None  # Limpiar estado
+        _pending_selection.set(None)  # Limpiar estado
         return True, selected_id, message
     
-    if not _pending_selection.can_retry():
-        _pending_selection = None
+    if not state.can_retry():
+        _pending_selection.set(None)
         return False, None, "Máximo de intentos alcanzado. Usa '/indicadores' para buscar de nuevo."
     
-    return False, None, message + f" ({_pending_selection.max_attempts - _pending_selection.attempts} intentos restantes)"
+    return False, None, message + f" ({state.max_attempts - state.attempts} intentos restantes)"
 
 
 def has_pending_selection() -> bool:
     """Verifica si hay una selección pendiente."""
-    return _pending_selection is not None
+    return _pending_selection.get() is not None
 
 
 def cancel_selection() -> None:
     """Cancela la selección pendiente."""
-    global _pending_selection
-    _pending_selection = None
+    _pending_selection.set(None)
 
 
 # =============================================================================
@@ -334,7 +334,7 @@ def resolve_query(query: str) -> QueryResolution:
             return QueryResolution(
                 indicator_code=normalized_query,
                 indicator_title=info.title,
-                dimensions_detected=analysis.dimensions,
+                dimensions_detected=list(analysis.dimensions),
                 has_breakdown=True,
                 message=dims_msg
             )
@@ -358,7 +358,7 @@ def resolve_query(query: str) -> QueryResolution:
         return QueryResolution(
             indicator_code=None,
             indicator_title=None,
-            dimensions_detected=analysis.dimensions,
+            dimensions_detected=list(analysis.dimensions),
             has_breakdown=analysis.has_breakdown,
             message=f"No se encontraron indicadores para '{indicator_query}'.",
             needs_clarification=False
@@ -381,7 +381,7 @@ def resolve_query(query: str) -> QueryResolution:
         return QueryResolution(
             indicator_code=ind.code,
             indicator_title=ind.title,
-            dimensions_detected=analysis.dimensions,
+            dimensions_detected=list(analysis.dimensions),
             has_breakdown=True,
             message=message
         )
@@ -390,7 +390,7 @@ def resolve_query(query: str) -> QueryResolution:
     return QueryResolution(
         indicator_code=None,
         indicator_title=None,
-        dimensions_detected=analysis.dimensions,
+        dimensions_detected=list(analysis.dimensions),
         has_breakdown=analysis.has_breakdown,
         message=f"Encontrados {len(candidates)} indicadores relacionados con '{indicator_query}'.",
         needs_clarification=True,
@@ -9,6 +9,7 @@ independiente del modelo LLM:
 from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from ._regex import CODE_RE, NUMERIC_RE
 from .ids_cache import get_cache, ensure_cache_loaded, IndicatorInfo
 from ..config import logger
 
@@ -152,8 +153,13 @@ class ResponseValidator:
                 message="La respuesta contiene datos pero NO tiene trazabilidad obligatoria."
             )
         
-        # Verificar keywords de trazabilidad
-        traza_count = sum(1 for kw in self.TRAZA_KEYWORDS if kw in response)
+        # Verificar keywords de trazabilidad (basta con 2: cortar al llegar)
+        traza_count = 0
+        for kw in self.TRAZA_KEYWORDS:
+            if kw in response:
+                traza_count += 1
+                if traza_count >= 2:
+                    break
         
         if traza_count < 2:
             return ValidationResult(
@@ -175,49 +181,67 @@ class ResponseValidator:
         Returns:
             True si contiene números que parecen datos estadísticos.
         """
-        import re
-        
-        # Buscar patrones numéricos típicos de datos estadísticos
-        patterns = [
-            r'\d{1,3}(?:\.\d{3})+',  # Números con separador de miles (1.234.567)
-            r'\d+(?:,\d+)?%',        # Porcentajes
-            r'\d{4,}',               # Números grandes (>= 1000)
-        ]
-        
-        for pattern in patterns:
-            if re.search(pattern, response):
-                return True
-        
-        return False
+        return NUMERIC_RE.search(response) is not None
 
 
 # =============================================================================
 # FUNCIONES DE CONVENIENCIA
 # =============================================================================
 
+# Instancias compartidas: los validadores no guardan estado por llamada
+_indicator_validator: Optional[IndicatorValidator] = None
+_response_validator: Optional[ResponseValidator] = None
+
+
+def get_indicator_validator() -> IndicatorValidator:
+    """Obtiene la instancia singleton del validador de indicadores."""
+    global _indicator_validator
+    if _indicator_validator is None:
+        _indicator_validator = IndicatorValidator()
+    return _indicator_validator
+
+
+def get_response_validator() -> ResponseValidator:
+    """Obtiene la instancia singleton del validador de respuestas."""
+    global _response_validator
+    if _response_validator is None:
+        _response_validator = ResponseValidator()
+    return _response_validator
+
+
 def validate_indicator(code: str) -> ValidationResult:
     """Valida un código de indicador."""
-    validator = IndicatorValidator()
-    return validator.validate_code(code)
+    return get_indicator_validator().validate_code(code)
 
 
 def validate_response(response: str) -> ValidationResult:
     """Valida una respuesta del LLM."""
-    rv = ResponseValidator()
+    rv = get_response_validator()
     has_numbers = rv.response_has_numbers(response)
     return rv.validate_response(response, has_numbers)
 
 
 def resolve_indicator(code: str) -> Tuple[bool, str, str]:
     """Resuelve un código de indicador."""
-    validator = IndicatorValidator()
-    return validator.resolve_code(code)
+    return get_indicator_validator().resolve_code(code)
 
 
 # =============================================================================
 # POST-VALIDACIÓN DE RESPUESTAS DEL LLM
 # =============================================================================
 
+# Falsos positivos comunes de CODE_RE
+_CODE_FALSE_POSITIVES = frozenset({
+    # Técnicos
+    'API_KEY', 'HTTP_ERROR', 'JSON_ERROR', 'UTF_8', 'ISO_8859',
+    # LLM internos
+    'TOOL_REQUEST', 'END_TOOL_REQUEST', 'TOOL_CALL', 'END_TOOL',
+    'FUNCTION_CALL', 'END_FUNCTION',
+    # Parámetros de herramientas
+    'ANNUAL_PERCENTAGE_RATE',
+})
+
+
 def detect_indicator_codes(text: str) -> List[str]:
     """Detecta posibles códigos de indicador en un texto.
     
@@ -231,25 +255,14 @@ def detect_indicator_codes(text: str) -> List[str]:
     Returns:
         Lista de posibles códigos encontrados.
     """
-    import re
-    
-    # Patrón: palabras en mayúsculas con guiones bajos
-    pattern = r'\b([A-Z][A-Z0-9]*(?:_[A-Z0-9]+)+)\b'
+    # Todo código lleva '_': sin él no hace falta pasar la regex
+    if '_' not in text:
+        return []
     
-    matches = re.findall(pattern, text)
+    matches = CODE_RE.findall(text)
     
     # Filtrar falsos positivos comunes
-    exclude = {
-        # Técnicos
-        'API_KEY', 'HTTP_ERROR', 'JSON_ERROR', 'UTF_8', 'ISO_8859',
-        # LLM internos
-        'TOOL_REQUEST', 'END_TOOL_REQUEST', 'TOOL_CALL', 'END_TOOL',
-        'FUNCTION_CALL', 'END_FUNCTION',
-        # Parámetros de herramientas
-        'ANNUAL_PERCENTAGE_RATE',
-    }
-    
-    return [m for m in matches if m not in exclude and len(m) > 5]
+    return [m for m in matches if m not in _CODE_FALSE_POSITIVES and len(m) > 5]
 
 
 @dataclass
@@ -274,11 +287,7 @@ def validate_response_codes(response: str) -> ResponseValidationResult:
     Returns:
         ResponseValidationResult con códigos válidos/inválidos.
     """
-    from .ids_cache import ensure_cache_loaded
-    
-    cache = ensure_cache_loaded()
-    
-    # Detectar códigos en el texto
+    # Detectar códigos en el texto (el cache solo hace falta si hay alguno)
     detected_codes = detect_indicator_codes(response)
     
     if not detected_codes:
@@ -290,6 +299,8 @@ def validate_response_codes(response: str) -> ResponseValidationResult:
             message="Sin códigos de indicador detectados"
         )
     
+    cache = ensure_cache_loaded()
+    
     valid_codes = []
     invalid_codes = []
     suggestions = {}
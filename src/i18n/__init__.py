@@ -16,24 +16,61 @@ Uso:
 
 import json
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Dict
+
+try:
+    import orjson
+except ImportError:  # Opcional: parser JSON más rápido
+    orjson = None
 
 # Directorio de traducciones
 _I18N_DIR = Path(__file__).parent
 
 # Idioma actual y traducciones cargadas
 _current_language: str = 'es'
-_translations: dict = {}
-_fallback_translations: dict = {}  # Siempre español como fallback
+# Tablas planas: 'menu.chat' → texto
+_translations: Dict[str, str] = {}
+_fallback_translations: Dict[str, str] = {}  # Siempre español como fallback
+# Tablas ya cargadas por idioma (los ficheros no cambian durante la ejecución)
+_lang_cache: Dict[str, Dict[str, str]] = {}
+# Idiomas disponibles (el directorio es estático, se lista una vez)
+_AVAILABLE_LANGUAGES = tuple(f.stem for f in _I18N_DIR.glob('*.json'))
 
 
-def _load_translations(lang: str) -> dict:
-    """Carga las traducciones de un idioma."""
+def _load_translations(lang: str) -> Dict[str, str]:
+    """Carga las traducciones de un idioma, aplanadas a claves con puntos.
+    
+    Cada idioma se lee y parsea una sola vez; las llamadas siguientes
+    devuelven la tabla cacheada.
+    """
+    cached = _lang_cache.get(lang)
+    if cached is not None:
+        return cached
+    
     file_path = _I18N_DIR / f'{lang}.json'
-    if file_path.exists():
+    if not file_path.exists():
+        return {}
+    
+    if orjson is not None:
+        data = orjson.loads(file_path.read_bytes())
+    else:
         with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+            data = json.load(f)
+    
+    translations = _lang_cache[lang] = _flatten(data)
+    return translations
+
+
+def _flatten(d: dict, prefix: str = '') -> Dict[str, str]:
+    """Aplana un diccionario anidado a {'a.b.c': texto} (solo hojas de texto)."""
+    flat = {}
+    for k, v in d.items():
+        path = f'{prefix}.{k}' if prefix else k
+        if isinstance(v, dict):
+            flat.update(_flatten(v, path))
+        elif isinstance(v, str):
+            flat[path] = v
+    return flat
 
 
 def set_language(lang: str) -> bool:
@@ -69,7 +106,7 @@ def get_language() -> str:
 
 def get_available_languages() -> list:
     """Devuelve los idiomas disponibles."""
-    return [f.stem for f in _I18N_DIR.glob('*.json')]
+    return list(_AVAILABLE_LANGUAGES)
 
 
 def t(key: str, **kwargs: Any) -> str:
@@ -92,14 +129,12 @@ def t(key: str, **kwargs: Any) -> str:
     if not _translations:
         set_language(_current_language)
     
-    # Buscar en las traducciones actuales
-    value = _get_nested_value(_translations, key)
-    
-    # Si no se encuentra, buscar en fallback
-    if value is None and _fallback_translations:
-        value = _get_nested_value(_fallback_translations, key)
+    # Buscar en las traducciones actuales y, si no, en fallback
+    value = _translations.get(key)
+    if value is None:
+        value = _fallback_translations.get(key)
     
-    # Si aún no se encuentra, devolver la clave
+    # Si no se encuentra, devolver la clave
     if value is None:
         return key
     
@@ -113,19 +148,5 @@ def t(key: str, **kwargs: Any) -> str:
     return value
 
 
-def _get_nested_value(d: dict, key: str) -> Optional[str]:
-    """Obtiene un valor anidado de un diccionario usando notación de puntos."""
-    keys = key.split('.')
-    value = d
-    
-    for k in keys:
-        if isinstance(value, dict) and k in value:
-            value = value[k]
-        else:
-            return None
-    
-    return value if isinstance(value, str) else None
-
-
 # Inicializar con español por defecto
 set_language('es')
@@ -4,13 +4,141 @@ LMStudio expone una API REST compatible con OpenAI en http://localhost:1234/v1.
 Este módulo proporciona una interfaz simple para interactuar con ella.
 """
 
+import hashlib
 import json
-from typing import Any, Callable, Dict, Generator, List, Optional
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
 
 from openai import OpenAI
 
 from .. import config
 
+try:
+    import orjson
+except ImportError:  # orjson es opcional: se usa json estándar
+    orjson = None
+
+
+# =============================================================================
+# SERIALIZACIÓN JSON
+# =============================================================================
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    _loads = orjson.loads
+    
+    def _dumps(obj: Any) -> str:
+        """Serializa resultados de tools (tipos numpy incluidos) a JSON."""
+        return orjson.dumps(obj, default=str, option=_ORJSON_OPTIONS).decode()
+else:
+    _loads = json.loads
+    
+    def _dumps(obj: Any) -> str:
+        """Serializa resultados de tools a JSON compacto (como orjson)."""
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+# =============================================================================
+# TRANSPORTE HTTP COMPARTIDO
+# =============================================================================
+
+# Pool de conexiones keep-alive hacia el servidor LLM
+LLM_POOL_KEEPALIVE = 32
+LLM_POOL_MAXSIZE = 64
+# Generar con modelos locales puede tardar minutos: mismo límite que el SDK
+LLM_TIMEOUT_SECONDS = 600.0
+LLM_CONNECT_TIMEOUT_SECONDS = 5.0
+# Hilos para ejecutar en paralelo varios tool_calls de un mismo mensaje
+MAX_PARALLEL_TOOLS = 8
+# Validez del resultado de is_available() (segundos)
+AVAILABLE_TTL_SECONDS = 5.0
+UNAVAILABLE_TTL_SECONDS = 1.0
+
+_http_client = None
+
+
+# =============================================================================
+# TOOL CALLS EN TEXTO
+# =============================================================================
+
+# Llaves de apertura/cierre o cadenas JSON completas (con escapes): el escáner
+# salta de una a otra en C y las llaves dentro de cadenas no cuentan
+_BRACE_RE = re.compile(r'[{}]|"(?:[^"\\]|\\.)*"')
+
+# Nombres alternativos (en minúsculas) que usa el LLM → nombre del parámetro
+_PARAM_ALIASES = {
+    'indicator_code': 'code',
+    'indicatorcode': 'code',
+    'indicator': 'code',
+    'cod': 'code',
+    'codigo': 'code',
+    'busqueda': 'query',
+    'search': 'query',
+    'texto': 'query',
+    'max': 'limit',
+    'max_results': 'limit',
+    'numero': 'limit',
+    'geography': 'geo',
+    'geographic': 'geo',
+    'geografico': 'geo',
+    'temporal': 'time',
+    'periodo': 'time',
+    'year': 'time',
+}
+
+
+def _get_http_client():
+    """Obtiene el cliente HTTP compartido por todos los LMStudioClient.
+    
+    Reutilizar un único pool evita abrir una conexión TCP nueva en cada
+    petición de la cadena búsqueda → info → datos → respuesta final.
+    
+    Returns:
+        El cliente, o None si no se puede crear (el SDK usa entonces su
+        cliente por defecto).
+    """
+    global _http_client
+    if _http_client is None:
+        try:
+            import httpx
+            from openai import DefaultHttpxClient
+            
+            _http_client = DefaultHttpxClient(
+                limits=httpx.Limits(
+                    max_keepalive_connections=LLM_POOL_KEEPALIVE,
+                    max_connections=LLM_POOL_MAXSIZE,
+                ),
+                timeout=httpx.Timeout(
+                    LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS
+                ),
+            )
+        except (ImportError, TypeError) as e:
+            config.logger.warning(f"Sin pool HTTP compartido para el LLM: {e}")
+            return None
+    return _http_client
+
+
+def _is_tool_error(result: Any) -> bool:
+    """Indica si un tool devolvió un error ({"error": ...})."""
+    return isinstance(result, dict) and 'error' in result
+
+
+@dataclass
+class _ChatTurn:
+    """Estado de una llamada a chat().
+    
+    Vive solo durante la llamada, de modo que varias llamadas concurrentes
+    sobre el mismo cliente no se pisan entre sí.
+    """
+    debug: bool = False
+    tool_calls: List[Dict] = field(default_factory=list)  # Solo en modo debug
+    tool_failed: bool = False
+
 
 class LMStudioClient:
     """Cliente para interactuar con LMStudio.
@@ -43,11 +171,22 @@ class LMStudioClient:
         self.temperature = temperature or llm_config.get('temperature', 0.7)
         self.max_tokens = max_tokens or llm_config.get('max_tokens', 4096)
         
-        # Cliente OpenAI configurado para LMStudio
+        # Cache LRU de respuestas: clave de consulta → (caduca_en, respuesta, tool calls)
+        self._response_cache: OrderedDict = OrderedDict()
+        self._response_cache_size = llm_config.get('response_cache_size', 0)
+        self._response_cache_ttl = llm_config.get('response_cache_ttl_seconds', 600)
+        self._cache_lock = threading.Lock()  # chat() puede llamarse desde varios hilos
+        # Tool calls del último chat() completado (modo debug)
+        self._last_tool_calls: List[Dict] = []
+        
+        # Cliente OpenAI configurado para LMStudio, sobre el pool compartido
         self._client = OpenAI(
             base_url=self.base_url,
-            api_key="not-needed"  # LMStudio no requiere API key
+            api_key="not-needed",  # LMStudio no requiere API key
+            http_client=_get_http_client(),
         )
+        # Último sondeo de disponibilidad: (caduca_en, disponible)
+        self._availability: Tuple[float, bool] = (0.0, False)
         
         # Tools registrados
         self._tools: Dict[str, Callable] = {}
@@ -56,21 +195,35 @@ class LMStudioClient:
     def register_tool(self, name: str, func: Callable, description: str, parameters: Dict) -> None:
         """Registra una función como tool disponible para el LLM.
         
+        Registrar de nuevo un nombre ya existente sustituye su definición,
+        de modo que el esquema enviado en cada petición no crece.
+        
         Args:
             name: Nombre del tool
             func: Función a ejecutar
             description: Descripción para el LLM
             parameters: Esquema JSON de parámetros
         """
-        self._tools[name] = func
-        self._tool_definitions.append({
+        definition = {
             "type": "function",
             "function": {
                 "name": name,
                 "description": description,
                 "parameters": parameters
             }
-        })
+        }
+        
+        if name in self._tools:
+            self._tool_definitions = [
+                definition if d["function"]["name"] == name else d
+                for d in self._tool_definitions
+            ]
+        else:
+            self._tool_definitions.append(definition)
+        
+        self._tools[name] = func
+        with self._cache_lock:
+            self._response_cache.clear()  # Las respuestas dependían del esquema anterior
     
     def chat(
         self,
@@ -92,21 +245,26 @@ class LMStudioClient:
         Returns:
             Respuesta del modelo como string.
         """
-        # Inicializar lista de tool calls para debug
-        self._last_tool_calls = []
-        self._debug = debug
-        messages = []
-        
-        # System prompt
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
-        # Historial
-        if history:
-            messages.extend(history)
-        
-        # Mensaje actual
-        messages.append({"role": "user", "content": message})
+        turn = _ChatTurn(debug=debug)
+        
+        # Consulta idéntica ya respondida: no volver a llamar al LLM
+        cache_key = None
+        if self._response_cache_size > 0:
+            cache_key = self._response_cache_key(message, system_prompt, history, use_tools, debug)
+            with self._cache_lock:
+                cached = self._response_cache.get(cache_key)
+                if cached is not None:
+                    if time.monotonic() < cached[0]:
+                        self._response_cache.move_to_end(cache_key)
+                    else:
+                        del self._response_cache[cache_key]
+                        cached = None
+            if cached is not None:
+                _, answer, tool_calls = cached
+                self._last_tool_calls = list(tool_calls)
+                return answer
+        
+        messages = self._build_messages(message, system_prompt, history)
         
         # Configuración de la llamada
         kwargs = {
@@ -129,23 +287,84 @@ class LMStudioClient:
             
             # Si hay tool calls estructurados, ejecutarlos
             if choice.message.tool_calls:
-                return self._handle_tool_calls(choice.message, messages)
+                answer = self._handle_tool_calls(choice.message, messages, turn)
+            else:
+                # Verificar si hay tool calls en el texto (algunos modelos lo hacen así)
+                content = choice.message.content or ""
+                text_tool_call = use_tools and self._extract_tool_call_from_text(content)
+                if text_tool_call:
+                    answer = self._handle_text_tool_call(text_tool_call, messages, turn)
+                else:
+                    answer = content
             
-            # Verificar si hay tool calls en el texto (algunos modelos lo hacen así)
-            content = choice.message.content or ""
-            text_tool_call = self._extract_tool_call_from_text(content)
-            if text_tool_call and use_tools:
-                return self._handle_text_tool_call(text_tool_call, messages)
+            # Una respuesta construida sobre un tool fallido no se reutiliza
+            if cache_key is not None and answer and not turn.tool_failed:
+                expires = time.monotonic() + self._response_cache_ttl
+                with self._cache_lock:
+                    self._response_cache[cache_key] = (expires, answer, tuple(turn.tool_calls))
+                    if len(self._response_cache) > self._response_cache_size:
+                        self._response_cache.popitem(last=False)
             
-            return content
+            self._last_tool_calls = turn.tool_calls
+            return answer
             
         except Exception as e:
             config.logger.error(f"Error en LMStudio: {e}")
             raise
     
+    def _build_messages(
+        self,
+        message: str,
+        system_prompt: Optional[str],
+        history: Optional[List[Dict[str, str]]],
+    ) -> List[Dict]:
+        """Construye la lista de mensajes: sistema, historial y mensaje actual."""
+        messages = []
+        
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        
+        if history:
+            messages.extend(history)
+        
+        messages.append({"role": "user", "content": message})
+        return messages
+    
+    def _response_cache_key(
+        self,
+        message: str,
+        system_prompt: Optional[str],
+        history: Optional[List[Dict[str, str]]],
+        use_tools: bool,
+        debug: bool,
+    ) -> Tuple:
+        """Clave de cache de una consulta.
+        
+        El mensaje se normaliza (mayúsculas y espacios); prompt de sistema,
+        historial y tools deben coincidir exactamente. El modo debug también
+        forma parte de la clave, porque solo entonces se guardan los tool calls.
+        """
+        return (
+            ' '.join(message.lower().split()),
+            system_prompt,
+            self._history_digest(history) if history else None,
+            use_tools and bool(self._tool_definitions),
+            debug,
+        )
+    
+    def _history_digest(self, history: List[Dict]) -> bytes:
+        """Huella del historial para la clave de cache."""
+        hasher = hashlib.blake2b(digest_size=16)
+        for msg in history:
+            hasher.update(_dumps(msg).encode('utf-8'))
+            hasher.update(b'\n')
+        return hasher.digest()
+    
     def _extract_tool_call_from_text(self, content: str) -> Optional[Dict]:
         """Extrae un tool call del texto si el modelo lo devuelve como JSON."""
-        import re
+        # Respuesta normal en lenguaje natural: nada que buscar
+        if '{' not in content:
+            return None
         
         # Limpiar el contenido - algunos modelos añaden espacios/newlines
         clean_content = content.strip()
@@ -153,7 +372,7 @@ class LMStudioClient:
         # Si el contenido parece ser solo un JSON, intentar parsearlo directamente
         if clean_content.startswith('{') and clean_content.endswith('}'):
             try:
-                tool_data = json.loads(clean_content)
+                tool_data = _loads(clean_content)
                 if 'name' in tool_data:
                     return {
                         'name': tool_data['name'],
@@ -164,25 +383,21 @@ class LMStudioClient:
         
         # Buscar JSON embebido en el texto
         # Encontrar la primera { y la última } balanceada
-        json_start = -1
-        for i, char in enumerate(content):
-            if char == '{':
-                json_start = i
-                break
-        
+        json_start = content.find('{')
         if json_start == -1:
             return None
         
-        # Encontrar el cierre balanceado
+        # Encontrar el cierre balanceado, visitando solo las llaves
         brace_count = 0
         json_end = json_start
-        for i, char in enumerate(content[json_start:]):
-            if char == '{':
+        for match in _BRACE_RE.finditer(content, json_start):
+            token = match.group()
+            if token == '{':
                 brace_count += 1
-            elif char == '}':
+            elif token == '}':
                 brace_count -= 1
                 if brace_count == 0:
-                    json_end = json_start + i + 1
+                    json_end = match.end()
                     break
         
         if json_end <= json_start:
@@ -191,7 +406,7 @@ class LMStudioClient:
         json_str = content[json_start:json_end]
         
         try:
-            tool_data = json.loads(json_str)
+            tool_data = _loads(json_str)
             
             # Verificar que tiene estructura de tool call
             if 'name' in tool_data:
@@ -212,44 +427,19 @@ class LMStudioClient:
     
     def _normalize_tool_args(self, func_name: str, args: Dict) -> Dict:
         """Normaliza los nombres de parámetros para compatibilidad con variaciones del LLM."""
-        normalized = {}
-        
-        # Mapeo de nombres alternativos a nombres correctos
-        param_aliases = {
-            'indicator_code': 'code',
-            'indicatorCode': 'code',
-            'indicator': 'code',
-            'cod': 'code',
-            'codigo': 'code',
-            'busqueda': 'query',
-            'search': 'query',
-            'texto': 'query',
-            'max': 'limit',
-            'max_results': 'limit',
-            'numero': 'limit',
-            'geography': 'geo',
-            'geographic': 'geo',
-            'geografico': 'geo',
-            'temporal': 'time',
-            'periodo': 'time',
-            'year': 'time',
+        return {
+            _PARAM_ALIASES.get(key.lower(), key): value
+            for key, value in args.items()
         }
-        
-        for key, value in args.items():
-            # Normalizar el nombre del parámetro
-            normalized_key = param_aliases.get(key.lower(), key)
-            normalized[normalized_key] = value
-        
-        return normalized
     
-    def _handle_text_tool_call(self, tool_call: Dict, messages: List[Dict]) -> str:
+    def _handle_text_tool_call(self, tool_call: Dict, messages: List[Dict], turn: _ChatTurn) -> str:
         """Procesa un tool call extraído del texto."""
         func_name = tool_call.get('name')
         func_args = tool_call.get('arguments', {})
         
         if isinstance(func_args, str):
             try:
-                func_args = json.loads(func_args)
+                func_args = _loads(func_args)
             except json.JSONDecodeError:
                 func_args = {}
         
@@ -258,24 +448,31 @@ class LMStudioClient:
         
         config.logger.debug(f"Ejecutando tool desde texto: {func_name}({func_args})")
         
-        if func_name in self._tools:
-            try:
-                result = self._tools[func_name](**func_args)
-                result_str = json.dumps(result, ensure_ascii=False, default=str)
-            except TypeError as e:
-                # Si hay error de parámetros, intentar ejecutar sin los parámetros problemáticos
-                config.logger.warning(f"Error de parámetros en {func_name}: {e}")
-                try:
-                    # Intentar solo con parámetros conocidos
-                    result = self._tools[func_name]()
-                    result_str = json.dumps(result, ensure_ascii=False, default=str)
-                except Exception as e2:
-                    result_str = json.dumps({"error": str(e2)})
-            except Exception as e:
-                result_str = json.dumps({"error": str(e)})
-        else:
+        func = self._tools.get(func_name)
+        if func is None:
+            turn.tool_failed = True
             return f"Tool '{func_name}' no encontrado"
         
+        try:
+            result = func(**func_args)
+            result_str = _dumps(result)
+        except TypeError as e:
+            # Si hay error de parámetros, intentar ejecutar sin los parámetros problemáticos
+            config.logger.warning(f"Error de parámetros en {func_name}: {e}")
+            try:
+                # Intentar solo con parámetros conocidos
+                result = func()
+                result_str = _dumps(result)
+            except Exception as e2:
+                result = {"error": str(e2)}
+                result_str = _dumps(result)
+        except Exception as e:
+            result = {"error": str(e)}
+            result_str = _dumps(result)
+        
+        if _is_tool_error(result):
+            turn.tool_failed = True
+        
         # Añadir el resultado al contexto y pedir respuesta final
         messages.append({
             "role": "assistant",
@@ -287,16 +484,9 @@ class LMStudioClient:
         })
         
         # Obtener respuesta final
-        response = self._client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=self.temperature,
-            max_tokens=self.max_tokens,
-        )
-        
-        return response.choices[0].message.content or ""
+        return self._finalize(messages)
     
-    def _handle_tool_calls(self, assistant_message, messages: List[Dict]) -> str:
+    def _handle_tool_calls(self, assistant_message, messages: List[Dict], turn: _ChatTurn) -> str:
         """Procesa las llamadas a tools y obtiene respuesta final."""
         # Añadir mensaje del asistente con tool calls
         messages.append({
@@ -315,28 +505,32 @@ class LMStudioClient:
             ]
         })
         
-        # Ejecutar cada tool
-        for tool_call in assistant_message.tool_calls:
-            func_name = tool_call.function.name
-            func_args = json.loads(tool_call.function.arguments)
-            
-            if func_name in self._tools:
-                try:
-                    result = self._tools[func_name](**func_args)
-                    result_str = json.dumps(result, ensure_ascii=False, default=str)
-                except Exception as e:
-                    result_str = json.dumps({"error": str(e)})
-                    result = {"error": str(e)}
-            else:
-                result_str = json.dumps({"error": f"Tool '{func_name}' not found"})
-                result = {"error": f"Tool '{func_name}' not found"}
+        # Ejecutar los tools; si hay varios (I/O contra la API), en paralelo
+        calls = [
+            (tool_call.function.name, _loads(tool_call.function.arguments))
+            for tool_call in assistant_message.tool_calls
+        ]
+        if len(calls) <= 1:
+            outcomes = [self._run_tool(*call) for call in calls]
+        else:
+            workers = min(MAX_PARALLEL_TOOLS, len(calls))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(lambda call: self._run_tool(*call), calls))
+        
+        # Resultados en el orden original de los tool_calls
+        for tool_call, (func_name, func_args), (result, result_str) in zip(
+            assistant_message.tool_calls, calls, outcomes
+        ):
+            if _is_tool_error(result):
+                turn.tool_failed = True
             
-            # Guardar para debug
-            self._last_tool_calls.append({
-                "name": func_name,
-                "args": func_args,
-                "result": result
-            })
+            # Guardar para debug (solo si se pidió: los resultados pueden ser grandes)
+            if turn.debug:
+                turn.tool_calls.append({
+                    "name": func_name,
+                    "args": func_args,
+                    "result": result
+                })
             
             # Añadir resultado del tool
             messages.append({
@@ -346,6 +540,33 @@ class LMStudioClient:
             })
         
         # Obtener respuesta final del LLM
+        return self._finalize(messages)
+    
+    def _run_tool(self, func_name: str, func_args: Dict) -> Tuple[Any, str]:
+        """Ejecuta un tool registrado.
+        
+        Returns:
+            Tupla (resultado, resultado serializado a JSON). Los errores se
+            devuelven como {"error": ...} para que el LLM pueda explicarlos.
+        """
+        func = self._tools.get(func_name)
+        if func is None:
+            error = {"error": f"Tool '{func_name}' not found"}
+            return error, _dumps(error)
+        
+        try:
+            result = func(**func_args)
+            return result, _dumps(result)
+        except Exception as e:
+            error = {"error": str(e)}
+            return error, _dumps(error)
+    
+    def _finalize(self, messages: List[Dict]) -> str:
+        """Pide al LLM la respuesta final con los resultados de tools ya en el contexto.
+        
+        Es la única segunda llamada por turno: depende del resultado de las
+        herramientas, así que no puede fusionarse con la primera.
+        """
         response = self._client.chat.completions.create(
             model=self.model,
             messages=messages,
@@ -366,15 +587,7 @@ class LMStudioClient:
         Yields:
             Fragmentos de texto de la respuesta.
         """
-        messages = []
-        
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
-        if history:
-            messages.extend(history)
-        
-        messages.append({"role": "user", "content": message})
+        messages = self._build_messages(message, system_prompt, history)
         
         try:
             stream = self._client.chat.completions.create(
@@ -394,21 +607,42 @@ class LMStudioClient:
             raise
     
     def is_available(self) -> bool:
-        """Verifica si LMStudio está disponible."""
+        """Verifica si LMStudio está disponible.
+        
+        El resultado se reutiliza unos segundos (menos si falló) para no
+        sondear el servidor en cada acción de la UI.
+        """
+        expires, available = self._availability
+        now = time.monotonic()
+        if now < expires:
+            return available
+        
         try:
-            self._client.models.list()
-            return True
+            # Sin reintentos: si el servidor local no responde, fallar ya
+            self._client.with_options(max_retries=0).models.list()
+            available = True
         except Exception:
-            return False
+            available = False
+        
+        ttl = AVAILABLE_TTL_SECONDS if available else UNAVAILABLE_TTL_SECONDS
+        self._availability = (now + ttl, available)
+        return available
 
 
 # Cliente singleton para uso global
 _client: Optional[LMStudioClient] = None
+_client_lock = threading.Lock()
 
 
 def get_client() -> LMStudioClient:
-    """Obtiene el cliente singleton de LMStudio."""
+    """Obtiene el cliente singleton de LMStudio.
+    
+    Seguro para llamadas concurrentes: todas las peticiones comparten el
+    mismo pool HTTP y LMStudio planifica las que lleguen a la vez.
+    """
     global _client
     if _client is None:
-        _client = LMStudioClient()
+        with _client_lock:
+            if _client is None:
+                _client = LMStudioClient()
     return _client
@@ -4,9 +4,15 @@ Estas funciones son expuestas al LLM como herramientas que puede invocar.
 Usa la API directa del ISTAC (sin istacpy).
 """
 
-from typing import Any, Dict, List, Optional
+import functools
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional
 
+from ..config import get
 from ..data import get_client
+from ..data.dimensions import GEO_GRANULARITIES, resolve_island, format_islands_list
+from ..data.ids_cache import ensure_cache_loaded
+from ..data.resolver import resolve_indicator
 
 
 # =============================================================================
@@ -49,7 +55,7 @@ TOOL_DEFINITIONS = [
     },
     {
         "name": "get_indicator_data",
-        "description": "Obtiene datos numéricos de un indicador con filtros opcionales.",
+        "description": "Obtiene datos numéricos de un indicador con filtros opcionales. Devuelve 'columns' (nombres) y 'rows' (listas de valores en el mismo orden que 'columns').",
         "parameters": {
             "type": "object",
             "properties": {
@@ -139,6 +145,48 @@ TOOL_DEFINITIONS = [
 # IMPLEMENTACIÓN DE TOOLS
 # =============================================================================
 
+# Valores geo válidos para la API: granularidades y agregados de Canarias
+_VALID_GEO_VALUES = frozenset({
+    'ISLANDS', 'MUNICIPALITIES', 'COUNTIES', 'PROVINCES', 'REGIONS',
+    'ES70', 'TOTAL', 'ALL',
+}) | frozenset(v.upper() for v in GEO_GRANULARITIES.values())
+
+
+def _candidates_response(code: str, result) -> Dict[str, Any]:
+    """Respuesta para un código inexistente: hasta 10 candidatos numerados."""
+    candidates = [
+        {
+            "num": i,
+            "code": c.code,
+            "title": c.title
+        }
+        for i, c in enumerate(islice(result.candidates, 10), start=1)
+    ]
+    
+    return {
+        "error": result.message,
+        "code_not_found": code,
+        "candidates": candidates,
+        "selection_required": result.needs_selection,
+        "instruction": "El usuario debe elegir un número (1-{}) o escribir el código exacto".format(len(candidates)) if candidates else "Usa search_indicators para buscar",
+    }
+
+
+def _requires_valid_code(func: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+    """Valida el código con Resolver antes de ejecutar la herramienta.
+    
+    Si el código no existe, devuelve los candidatos para selección
+    sin llegar a consultar la API.
+    """
+    @functools.wraps(func)
+    def wrapper(code: str, *args, **kwargs) -> Dict[str, Any]:
+        result = resolve_indicator(code)
+        if not result.success:
+            return _candidates_response(code, result)
+        return func(code, *args, **kwargs)
+    return wrapper
+
+
 def search_indicators(query: str = "", limit: int = 25) -> Dict[str, Any]:
     """Busca indicadores por texto usando cache local.
     
@@ -148,10 +196,16 @@ def search_indicators(query: str = "", limit: int = 25) -> Dict[str, Any]:
     3. Código empieza con query
     4. Otras coincidencias (títulos más cortos primero)
     """
-    from ..data.ids_cache import ensure_cache_loaded
+    # Consultas vacías o solo espacios: ni siquiera se recorre el cache
+    query = (query or "").strip()
+    if not query:
+        return {
+            "count": 0,
+            "indicators": [],
+            "note": "Especifica un término de búsqueda"
+        }
     
-    cache = ensure_cache_loaded()
-    results = cache.search(query, limit) if query else []
+    results = ensure_cache_loaded().search(query, limit)
     
     # Formatear para el LLM
     indicators = [
@@ -166,40 +220,17 @@ def search_indicators(query: str = "", limit: int = 25) -> Dict[str, Any]:
     return {
         "count": len(indicators),
         "indicators": indicators,
-        "note": f"Se encontraron {len(indicators)} indicadores" if query else "Especifica un término de búsqueda"
+        "note": f"Se encontraron {len(indicators)} indicadores"
     }
 
 
+@_requires_valid_code
 def get_indicator_info(code: str) -> Dict[str, Any]:
     """Obtiene información de un indicador.
     
     VALIDA que el código exista antes de consultar la API.
     Si no existe, usa Resolver para sugerir candidatos.
     """
-    from ..data.resolver import resolve_indicator
-    
-    # Resolver el código (valida + busca alternativas si no existe)
-    result = resolve_indicator(code)
-    
-    if not result.success:
-        # No existe - devolver candidatos para selección
-        candidates = [
-            {
-                "num": i+1,
-                "code": c.code,
-                "title": c.title
-            }
-            for i, c in enumerate(result.candidates[:10])
-        ]
-        
-        return {
-            "error": result.message,
-            "code_not_found": code,
-            "candidates": candidates,
-            "selection_required": result.needs_selection,
-            "instruction": "El usuario debe elegir un número (1-{}) o escribir el código exacto".format(len(candidates)) if candidates else "Usa search_indicators para buscar",
-        }
-    
     # Código válido - consultar API
     client = get_client()
     info = client.get_indicator(code)
@@ -208,6 +239,7 @@ def get_indicator_info(code: str) -> Dict[str, Any]:
     return {"error": f"No se encontró el indicador '{code}'"}
 
 
+@_requires_valid_code
 def get_indicator_data(
     code: str,
     geo: Optional[str] = None,
@@ -220,47 +252,12 @@ def get_indicator_data(
     VALIDA que los filtros geo sean conocidos.
     APLICA límites de filas para proteger el LLM.
     """
-    from ..data.resolver import resolve_indicator
-    from ..data.dimensions import GEO_GRANULARITIES, resolve_island, format_islands_list
-    from ..config import get
-    
-    # Resolver el código (valida + busca alternativas si no existe)
-    result = resolve_indicator(code)
-    
-    if not result.success:
-        # No existe - devolver candidatos para selección
-        candidates = [
-            {
-                "num": i+1,
-                "code": c.code,
-                "title": c.title
-            }
-            for i, c in enumerate(result.candidates[:10])
-        ]
-        
-        return {
-            "error": result.message,
-            "code_not_found": code,
-            "candidates": candidates,
-            "selection_required": result.needs_selection,
-            "instruction": "El usuario debe elegir un número (1-{}) o escribir el código exacto".format(len(candidates)) if candidates else "Usa search_indicators para buscar",
-        }
-    
     # B3: VALIDAR FILTRO GEO
     # =====================
     if geo:
-        geo_upper = geo.upper()
-        
-        # Lista de valores geo válidos para la API
-        VALID_GEO_VALUES = {
-            'ISLANDS', 'MUNICIPALITIES', 'COUNTIES', 'PROVINCES', 'REGIONS',
-            'ES70', 'TOTAL', 'ALL',
-        }
-        
         # También aceptar códigos de isla (38, 35, etc.)
         is_valid_geo = (
-            geo_upper in VALID_GEO_VALUES or
-            geo_upper in [v.upper() for v in GEO_GRANULARITIES.values()] or
+            geo.upper() in _VALID_GEO_VALUES or
             resolve_island(geo) is not None or
             geo.isdigit()  # Código numérico de isla
         )
@@ -280,30 +277,32 @@ def get_indicator_data(
     # Obtener límites de config
     limits = get("limits", {})
     max_rows = limits.get("max_rows_to_show", 500)
+    max_cells = limits.get("max_cells_to_llm", 5000)
     
     client = get_client()
-    df, traceability = client.get_indicator_data(code, geo, time, measure)
+    # Solo se decodifican las filas que pueden llegar al LLM
+    df, traceability = client.get_indicator_data(code, geo, time, measure, limit=max_rows)
     
     if df is None:
         return {"error": f"No se pudieron obtener datos de '{code}'"}
     
-    # Aplicar límite de filas
-    total_rows = len(df)
-    if total_rows > max_rows:
-        df = df.head(max_rows)
-        truncated = True
-    else:
-        truncated = False
-    
-    # Convertir DataFrame a formato para LLM
-    data_dict = df.to_dict(orient='records')
+    # Aplicar límite de filas (y de celdas: tablas anchas envían menos filas)
+    if len(df.columns):
+        max_rows = min(max_rows, max(1, max_cells // len(df.columns)))
+    total_rows = df.attrs.get("total_rows", len(df))
+    truncated = total_rows > max_rows
+    if truncated:
+        df = df.iloc[:max_rows]
     
+    # Convertir DataFrame a formato columnar para el LLM: cabecera una vez y
+    # filas como listas (sin repetir los nombres de columna en cada fila).
+    # NaN → None: el json estándar escribiría NaN, que no es JSON válido
     result = {
-        "data": data_dict,
+        "columns": list(df.columns),
+        "rows": df.astype(object).where(df.notna(), None).to_numpy().tolist(),
         "count": len(df),
         "total_rows": total_rows,
         "truncated": truncated,
-        "columns": list(df.columns),
     }
     
     if truncated:
@@ -318,7 +317,8 @@ def get_indicator_data(
 def list_datasets(limit: int = 25, query: str = "") -> Dict[str, Any]:
     """Lista datasets disponibles."""
     client = get_client()
-    results = client.list_datasets(limit, query)
+    # "  " y "" comparten la entrada de cache del listado sin filtro
+    results = client.list_datasets(limit, (query or "").strip())
     return {
         "count": len(results),
         "datasets": results
@@ -370,21 +370,28 @@ TOOL_FUNCTIONS = {
 }
 
 
+# (nombre, función, descripción, parámetros) de cada tool con implementación
+_REGISTRATION_SPEC = tuple(
+    (d["name"], TOOL_FUNCTIONS[d["name"]], d["description"], d["parameters"])
+    for d in TOOL_DEFINITIONS
+    if d["name"] in TOOL_FUNCTIONS
+)
+
+
 def register_tools(llm_client) -> None:
     """Registra todos los tools en el cliente LLM."""
-    for tool_def in TOOL_DEFINITIONS:
-        name = tool_def["name"]
-        if name in TOOL_FUNCTIONS:
-            llm_client.register_tool(
-                name=name,
-                func=TOOL_FUNCTIONS[name],
-                description=tool_def["description"],
-                parameters=tool_def["parameters"]
-            )
+    for name, func, description, parameters in _REGISTRATION_SPEC:
+        llm_client.register_tool(
+            name=name,
+            func=func,
+            description=description,
+            parameters=parameters
+        )
 
 
 def execute_tool(name: str, **kwargs) -> Dict[str, Any]:
     """Ejecuta un tool por nombre."""
-    if name in TOOL_FUNCTIONS:
-        return TOOL_FUNCTIONS[name](**kwargs)
-    return {"error": f"Tool '{name}' no encontrado"}
+    func = TOOL_FUNCTIONS.get(name)
+    if func is None:
+        return {"error": f"Tool '{name}' no encontrado"}
+    return func(**kwargs)
@@ -8,6 +8,7 @@ Uso:
     python -m src.main info CODE  # Info de un indicador
 """
 
+import re
 import sys
 from typing import Optional
 
@@ -17,12 +18,15 @@ from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.table import Table
+from rich.text import Text
 
 from .config import get, logger
 from .i18n import t, set_language, get_language
 from .llm import get_client as get_llm_client, get_system_prompt
-from .llm.tools import register_tools
+from .llm.tools import TOOL_FUNCTIONS, register_tools
 from .data import get_client as get_istac_client
+from .data.ids_cache import ensure_cache_loaded
+from .data.validator import validate_response_codes, format_code_correction
 
 # CLI app
 app = typer.Typer(
@@ -34,6 +38,31 @@ app = typer.Typer(
 # Console para rich output
 console = Console()
 
+# Palabras para salir del chat
+_EXIT_WORDS = frozenset({'salir', 'exit', 'quit', 'q'})
+
+# Cualquier carácter con significado en Markdown (incluidos saltos de línea,
+# que Markdown reflota), inicio de lista, separador, bloque indentado o vacío
+_MARKDOWN_RE = re.compile(
+    r'[*_`#\[\]>\\&<|~\n\t]|^\s*(?:(?:[-+]|\d+[.)])\s|---)|^ {4}|^\s*$'
+)
+
+
+def _chat_labels():
+    """Textos traducidos del bucle de chat: prompt, 'pensando' y título."""
+    return (
+        f"[bold cyan]{t('chat.prompt')}[/bold cyan]",
+        f"[dim]{t('chat.thinking')}[/dim]",
+        t('chat.assistant'),
+    )
+
+
+def _render_response(response: str):
+    """Markdown solo si la respuesta lo usa; texto plano si no (mismo resultado)."""
+    if _MARKDOWN_RE.search(response):
+        return Markdown(response)
+    return Text(response.strip())
+
 
 @app.command()
 def chat(
@@ -60,7 +89,6 @@ def chat(
     console.print()
     
     # Pre-cargar cache de indicadores desde TSV (259 indicadores)
-    from .data.ids_cache import ensure_cache_loaded
     cache = ensure_cache_loaded()
     console.print(f"[dim]📊 Cache: {cache.count()} indicadores cargados[/dim]")
     
@@ -79,16 +107,20 @@ def chat(
     # Estado de debug interactivo
     debug_mode = debug
     
+    # Textos del bucle (se recalculan al cambiar de idioma)
+    prompt_label, thinking_label, assistant_title = _chat_labels()
+    
     while True:
         try:
             # Input del usuario
-            user_input = Prompt.ask(f"[bold cyan]{t('chat.prompt')}[/bold cyan]")
+            user_input = Prompt.ask(prompt_label)
             
             if not user_input.strip():
                 continue
             
-            # Comandos especiales
-            if user_input.lower() in ('salir', 'exit', 'quit', 'q'):
+            # Comandos especiales (normalizados una sola vez)
+            command = user_input.lower()
+            if command in _EXIT_WORDS:
                 console.print(f"\n[blue]{t('goodbye')}[/blue]")
                 break
             
@@ -97,11 +129,12 @@ def chat(
                 if new_lang in ('es', 'en'):
                     set_language(new_lang)
                     system_prompt = get_system_prompt(new_lang)
+                    prompt_label, thinking_label, assistant_title = _chat_labels()
                     console.print(f"[green]{t('language_changed')}[/green]")
                 continue
             
             # Comando /debug - toggle
-            if user_input.lower() == '/debug':
+            if command == '/debug':
                 debug_mode = not debug_mode
                 status = "✅ ACTIVADO" if debug_mode else "❌ DESACTIVADO"
                 console.print(f"[yellow]Modo debug: {status}[/yellow]")
@@ -110,18 +143,16 @@ def chat(
                 continue
             
             # Comando /tools - listar herramientas
-            if user_input.lower() == '/tools':
-                from .llm.tools import TOOL_FUNCTIONS
+            if command == '/tools':
                 console.print("[bold]Herramientas disponibles:[/bold]")
                 for name in TOOL_FUNCTIONS:
                     console.print(f"  • {name}")
                 continue
             
             # Comando /indicadores - buscar indicadores reales
-            if user_input.lower().startswith('/indicadores'):
+            if command.startswith('/indicadores'):
                 query = user_input[12:].strip() or "poblacion"
-                from .data import get_client
-                istac = get_client()
+                istac = get_istac_client()
                 results = istac.search_indicators(query, limit=10)
                 console.print(f"[bold]Indicadores con '{query}':[/bold]")
                 for r in results:
@@ -129,7 +160,7 @@ def chat(
                 continue
             
             # Enviar al LLM
-            console.print(f"[dim]{t('chat.thinking')}[/dim]")
+            console.print(thinking_label)
             
             try:
                 # Usar chat con tools
@@ -155,14 +186,12 @@ def chat(
                 # Mostrar respuesta en Panel verde
                 console.print()
                 console.print(Panel(
-                    Markdown(response),
-                    title=t('chat.assistant'),
+                    _render_response(response),
+                    title=assistant_title,
                     border_style="green"
                 ))
                 
                 # POST-VALIDACIÓN: Detectar códigos inventados
-                from .data.validator import validate_response_codes, format_code_correction
-                
                 code_validation = validate_response_codes(response)
                 if not code_validation.is_valid:
                     # Mostrar advertencia con códigos inválidos y sugerencias
@@ -179,9 +208,8 @@ def chat(
                 history.append({"role": "user", "content": user_input})
                 history.append({"role": "assistant", "content": response})
                 
-                # Limitar historial
-                if len(history) > 20:
-                    history = history[-20:]
+                # Limitar historial (en el sitio: sin copiar la lista)
+                del history[:-20]
                     
             except Exception as e:
                 console.print(f"[red]❌ Error: {e}[/red]")
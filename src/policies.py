@@ -53,7 +53,7 @@ LIMITS = SystemLimits.from_config()
 # BLOQUE DE TRAZABILIDAD (Obligatorio en respuestas con datos)
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class DataTraceability:
     """Bloque de trazabilidad para respuestas con datos numéricos.
     
@@ -1,7 +1,24 @@
+import re
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import numpy as np
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:  # orjson es opcional: se usa response.json()
+    orjson = None
+
+try:
+    from requests_cache import CachedSession
+except ImportError:  # requests-cache es opcional: sin cache HTTP
+    CachedSession = None
+
 # URL base de la API del ISTAC para recursos estadísticos
 BASE_URL = "https://datos.canarias.es/api/estadisticas/statistical-resources/v1.0"
 
@@ -10,6 +27,129 @@ BASE_URL = "https://datos.canarias.es/api/estadisticas/statistical-resources/v1.
 DATASET_ID = "E30260A_000001"  # Población según sexos y edades por municipios/islas
 VERSION = "~latest"  # Última versión disponible
 
+# Códigos de isla: ES70 + un carácter (ES703, ES704, ...)
+ISLA_RE = re.compile(r'ES70.')
+
+# Cache HTTP en disco (solo con requests-cache instalado)
+CACHE_FILE = Path(__file__).parent.parent / ".cache" / "test_api_http"
+CACHE_TTL = timedelta(hours=24)
+
+# (conexión, lectura) en segundos: no quedarse colgado con sockets muertos
+TIMEOUT = (3.05, 30)
+
+_session = None
+
+
+def obtener_sesion():
+    """
+    Sesión HTTP compartida con pool de conexiones. Con requests-cache
+    guarda las respuestas en disco y, si la API falla, sirve la última
+    copia aunque haya caducado.
+    """
+    global _session
+    if _session is None:
+        if CachedSession is None:
+            _session = requests.Session()
+        else:
+            CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            _session = CachedSession(
+                str(CACHE_FILE),
+                backend="sqlite",
+                expire_after=CACHE_TTL,
+                stale_if_error=True,
+            )
+        # Reutilizar conexiones TCP/TLS entre datasets
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+
+@lru_cache(maxsize=8)
+def cargar_dataset(dataset_id, version):
+    """
+    Descarga y parsea un dataset (una sola vez por proceso).
+    """
+    url = f"{BASE_URL}/datasets/ISTAC/{dataset_id}/{version}.json"
+    response = obtener_sesion().get(url, timeout=TIMEOUT)
+    response.raise_for_status()
+    if orjson is None:
+        return response.json()
+    return orjson.loads(response.content)
+
+def decodificar_observaciones(observations, dim_keys):
+    """
+    Decodifica de una vez las claves 'i:j:k:l' de las observaciones.
+    
+    Devuelve (posiciones, valores): una matriz con la posición de cada
+    dimensión (len(keys) si el índice está fuera de rango) y los valores,
+    solo para las claves con al menos tantos índices como dimensiones.
+    """
+    n_dims = len(dim_keys)
+    partes = pd.Series(list(observations.keys()), dtype=object).str.split(':')
+    validas = (partes.str.len() >= n_dims).to_numpy()
+    
+    posiciones = np.array(
+        partes[validas].str[:n_dims].tolist(), dtype=np.int64
+    ).reshape(-1, n_dims)
+    valores = np.array(list(observations.values()), dtype=object)[validas]
+    
+    for j, keys in enumerate(dim_keys):
+        pos = posiciones[:, j]
+        posiciones[:, j] = np.where((pos >= 0) & (pos < len(keys)), pos, len(keys))
+    
+    return posiciones, valores
+
+
+def _posicion(keys, codigo):
+    """Posición de un código en su dimensión (-1 si no existe: nunca coincide)."""
+    return keys.index(codigo) if codigo in keys else -1
+
+
+def filtrar_hombres_islas(posiciones, valores, dim_keys):
+    """
+    Observaciones con sexo masculino, total de edades y nivel isla, de
+    todos los años en un solo pase: devuelve (años, territorios, valores).
+    
+    Se comparan posiciones enteras, no cadenas, y la regex de isla se
+    evalúa una vez por código de territorio, no por observación.
+    """
+    territorio_keys, sexo_keys, edad_keys, tiempo_keys = dim_keys
+    
+    # Solo islas (códigos de 5 caracteres como ES703, ES704, etc.);
+    # la última posición es la de "fuera de rango"
+    es_isla = np.array(
+        [ISLA_RE.fullmatch(k) is not None for k in territorio_keys] + [False]
+    )
+    mask = (
+        (posiciones[:, 1] == _posicion(sexo_keys, 'M'))
+        & (posiciones[:, 2] == _posicion(edad_keys, '_T'))
+        & es_isla[posiciones[:, 0]]
+    )
+    
+    seleccion = posiciones[mask]
+    territorio = np.array(territorio_keys + (None,), dtype=object)[seleccion[:, 0]]
+    tiempo = np.array(tiempo_keys + (None,), dtype=object)[seleccion[:, 3]]
+    return tiempo, territorio, valores[mask]
+
+
+def tabla_islas(filtrado, territorio_dim, año):
+    """
+    DataFrame (Isla, Código, Población Hombres) de un año a partir de
+    filtrar_hombres_islas(); vacío si no hay filas.
+    """
+    tiempo, territorio, valores = filtrado
+    sel = tiempo == año
+    
+    # Columnas directamente (sin pasar por un dict por fila)
+    codigos = territorio[sel].tolist()
+    return pd.DataFrame({
+        'Isla': [territorio_dim[c].get('name', {}).get('es', c) for c in codigos],
+        'Código': codigos,
+        'Población Hombres': valores[sel].tolist(),
+    })
+
+
 def obtener_poblacion_hombres_islas_2025():
     """
     Obtiene los datos de población de hombres en Canarias por islas para 2025
@@ -21,12 +161,8 @@ def obtener_poblacion_hombres_islas_2025():
     print(f"Consultando: {url}\n")
     
     try:
-        # Hacer la petición GET
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        # Parsear la respuesta JSON
-        data = response.json()
+        # Hacer la petición GET y parsear el JSON (con cache si está disponible)
+        data = cargar_dataset(DATASET_ID, VERSION)
         
         # Extraer información básica
         print("=" * 60)
@@ -49,45 +185,25 @@ def obtener_poblacion_hombres_islas_2025():
         sexo_dim = dimensions.get('SEX', {}).get('representation', {}).get('index', {})
         edad_dim = dimensions.get('AGE', {}).get('representation', {}).get('index', {})
         
-        # Crear DataFrame para resultados
-        resultados = []
+        # Códigos por posición, calculados una sola vez (no por observación)
+        dim_keys = (
+            tuple(territorio_dim.keys()),
+            tuple(sexo_dim.keys()),
+            tuple(edad_dim.keys()),
+            tuple(tiempo_dim.keys()),
+        )
         
         # Buscar datos de 2025, hombres, todas las edades, por islas
         print("\nBuscando datos de población masculina por islas en 2025...")
         print("-" * 60)
         
-        # Iterar sobre las observaciones
-        for key, value in observations.items():
-            indices = key.split(':')
-            
-            # Decodificar las dimensiones
-            if len(indices) >= 4:
-                # Obtener los valores de cada dimensión
-                territorio_code = list(territorio_dim.keys())[int(indices[0])] if int(indices[0]) < len(territorio_dim) else None
-                sexo_code = list(sexo_dim.keys())[int(indices[1])] if int(indices[1]) < len(sexo_dim) else None
-                edad_code = list(edad_dim.keys())[int(indices[2])] if int(indices[2]) < len(edad_dim) else None
-                tiempo_code = list(tiempo_dim.keys())[int(indices[3])] if int(indices[3]) < len(tiempo_dim) else None
-                
-                # Filtrar: año 2025, sexo masculino, total edades, nivel isla
-                if (tiempo_code == '2025' and 
-                    sexo_code == 'M' and 
-                    edad_code == '_T' and
-                    territorio_code and territorio_code.startswith('ES70')):
-                    
-                    # Obtener nombres descriptivos
-                    territorio_nombre = territorio_dim[territorio_code].get('name', {}).get('es', territorio_code)
-                    
-                    # Solo islas (códigos de 5 caracteres como ES703, ES704, etc.)
-                    if len(territorio_code) == 5:
-                        resultados.append({
-                            'Isla': territorio_nombre,
-                            'Código': territorio_code,
-                            'Población Hombres': value
-                        })
+        # Decodificar todas las observaciones a la vez (vectorizado)
+        posiciones, valores = decodificar_observaciones(observations, dim_keys)
+        filtrado = filtrar_hombres_islas(posiciones, valores, dim_keys)
+        df = tabla_islas(filtrado, territorio_dim, '2025')
         
-        # Crear DataFrame y ordenar
-        if resultados:
-            df = pd.DataFrame(resultados)
+        # Ordenar
+        if not df.empty:
             df = df.sort_values('Población Hombres', ascending=False)
             
             print("\n📊 POBLACIÓN MASCULINA POR ISLAS DE CANARIAS - 2025")
@@ -107,30 +223,10 @@ def obtener_poblacion_hombres_islas_2025():
                 año_reciente = años_disponibles[0]
                 print(f"\n📅 Año más reciente con datos: {año_reciente}")
                 
-                # Repetir búsqueda con año más reciente
-                for key, value in observations.items():
-                    indices = key.split(':')
-                    if len(indices) >= 4:
-                        territorio_code = list(territorio_dim.keys())[int(indices[0])]
-                        sexo_code = list(sexo_dim.keys())[int(indices[1])]
-                        edad_code = list(edad_dim.keys())[int(indices[2])]
-                        tiempo_code = list(tiempo_dim.keys())[int(indices[3])]
-                        
-                        if (tiempo_code == año_reciente and 
-                            sexo_code == 'M' and 
-                            edad_code == '_T' and
-                            territorio_code.startswith('ES70') and
-                            len(territorio_code) == 5):
-                            
-                            territorio_nombre = territorio_dim[territorio_code].get('name', {}).get('es', territorio_code)
-                            resultados.append({
-                                'Isla': territorio_nombre,
-                                'Código': territorio_code,
-                                'Población Hombres': value
-                            })
+                # Mismo filtrado, otro año (sin volver a recorrer las observaciones)
+                df = tabla_islas(filtrado, territorio_dim, año_reciente)
                 
-                if resultados:
-                    df = pd.DataFrame(resultados)
+                if not df.empty:
                     df = df.sort_values('Población Hombres', ascending=False)
                     print(f"\n📊 POBLACIÓN MASCULINA POR ISLAS - {año_reciente}")
                     print("=" * 60)
@@ -4,12 +4,13 @@
 Ejecutar: python tests/test_bloques.py
 
 Verifica:
+- A0: Sin módulos duplicados en src/
 - A1: Cache global inmutable (259 indicadores)
 - A2: Normalización de IDs (tildes)
 - A3: Validación de códigos inventados
 - A4: Post-validación de respuestas
 - B0: Catálogo fijo
-- B1: Indicador base vs desglose
+- B1: Indicador base vs desglose (también en plural)
 """
 
 import sys
@@ -25,6 +26,20 @@ from rich.panel import Panel
 console = Console()
 
 
+def test_modulos_unicos():
+    """A0: Ningún módulo de src/ comparte nombre con otro (salvo __init__.py)."""
+    from collections import Counter
+    
+    src_dir = Path(__file__).parent.parent / "src"
+    names = Counter(
+        p.name for p in src_dir.rglob("*.py") if p.name != "__init__.py"
+    )
+    duplicated = sorted(name for name, n in names.items() if n > 1)
+    
+    passed = not duplicated
+    return passed, f"Duplicados: {duplicated or 'ninguno'}"
+
+
 def test_cache_global():
     """A1: Cache global con 259 indicadores desde TSV."""
     from src.data.ids_cache import ensure_cache_loaded, get_cache
@@ -165,6 +180,30 @@ def test_analyze_query():
     return all_passed, "\n".join(messages)
 
 
+def test_analyze_query_plurales():
+    """B1c: Dimensiones en plural ("por nacionalidades", "por meses")."""
+    from src.data.dimensions import analyze_query
+    
+    tests = [
+        ("turismo por nacionalidades", "turismo", {"NATIONALITY"}),
+        ("paro por trimestres", "paro", {"TIME"}),
+        ("población por sexos", "población", {"SEX"}),
+        ("población por islas", "población", {"GEOGRAPHICAL"}),
+    ]
+    
+    all_passed = True
+    messages = []
+    
+    for query, expected_ind, expected_types in tests:
+        result = analyze_query(query)
+        passed = result.indicator_query == expected_ind and result.dimension_types == expected_types
+        all_passed = all_passed and passed
+        emoji = "✅" if passed else "❌"
+        messages.append(f'"{query}" → tipos={set(result.dimension_types)} {emoji}')
+    
+    return all_passed, "\n".join(messages)
+
+
 def test_resolve_query():
     """B1b: resolve_query con mensaje educativo."""
     from src.data.resolver import resolve_query
@@ -239,6 +278,7 @@ def run_all_tests():
     console.print()
     
     tests = [
+        ("A0: Módulos sin duplicados", test_modulos_unicos),
         ("A1: Cache global (259 IDs)", test_cache_global),
         ("A2: Normalización tildes", test_normalizacion),
         ("A3: Cache inmutable", test_cache_inmutable),
@@ -247,6 +287,7 @@ def run_all_tests():
         ("A6: Exclusiones (TOOL_REQUEST)", test_exclusiones),
         ("B1: Analyze query (dims)", test_analyze_query),
         ("B1b: Resolve query educativo", test_resolve_query),
+        ("B1c: Dimensiones en plural", test_analyze_query_plurales),
         ("B2: Valores de dimensión", test_dimension_values),
         ("B3: Bloqueo filtros inventados", test_filter_validation),
     ]
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""Tests manuales para verificar el cliente LLM.
+
+Ejecutar: python tests/test_llm.py
+
+Verifica:
+- L1: Extracción de tool calls escritos como JSON en el texto
+"""
+
+import sys
+from pathlib import Path
+
+# Añadir src al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+
+console = Console()
+
+
+def test_tool_call_en_texto():
+    """L1: JSON suelto, en bloque ```json, con argumentos anidados y prosa con llaves."""
+    from src.llm.lmstudio import LMStudioClient
+
+    client = LMStudioClient()
+
+    tests = [
+        (
+            "JSON suelto",
+            '{"name": "search_indicators", "arguments": {"query": "paro"}}',
+            {"name": "search_indicators", "arguments": {"query": "paro"}},
+        ),
+        (
+            "Bloque ```json",
+            'Consulto los datos:\n```json\n'
+            '{"name": "get_indicator_data", "parameters": {"code": "POBLACION", "geo": "ISLANDS"}}\n```',
+            {"name": "get_indicator_data", "arguments": {"code": "POBLACION", "geo": "ISLANDS"}},
+        ),
+        (
+            "Argumentos anidados",
+            'Llamada: {"function": {"name": "get_indicator_data", '
+            '"arguments": {"code": "TURISTAS", "filters": {"time": "2023", "note": "a}b"}}}} hecho',
+            {"name": "get_indicator_data",
+             "arguments": {"code": "TURISTAS", "filters": {"time": "2023", "note": "a}b"}}},
+        ),
+        (
+            "Prosa con llaves",
+            "La población {total} de Canarias creció; el conjunto {1, 2} no es JSON.",
+            None,
+        ),
+        (
+            "Prosa sin llaves",
+            "La población de Canarias en 2023 fue de 2,2 millones.",
+            None,
+        ),
+    ]
+
+    all_passed = True
+    messages = []
+
+    for label, content, expected in tests:
+        result = client._extract_tool_call_from_text(content)
+        passed = result == expected
+        all_passed = all_passed and passed
+        emoji = "✅" if passed else "❌"
+        messages.append(f"{label} → {result} {emoji}")
+
+    return all_passed, "\n".join(messages)
+
+
+def run_all_tests():
+    """Ejecuta todos los tests y muestra resultados."""
+
+    console.print(Panel("🧪 Tests del cliente LLM", style="bold blue"))
+    console.print()
+
+    tests = [
+        ("L1: Tool calls en texto", test_tool_call_en_texto),
+    ]
+
+    table = Table(title="Resultados")
+    table.add_column("Test", style="cyan")
+    table.add_column("Estado", justify="center")
+    table.add_column("Detalle")
+
+    total_passed = 0
+    total_tests = len(tests)
+
+    for name, test_func in tests:
+        try:
+            passed, detail = test_func()
+            status = "✅ PASS" if passed else "❌ FAIL"
+            if passed:
+                total_passed += 1
+            table.add_row(name, status, detail[:60] + "..." if len(detail) > 60 else detail)
+        except Exception as e:
+            table.add_row(name, "💥 ERROR", str(e)[:60])
+
+    console.print(table)
+    console.print()
+    console.print(f"Resultado: {total_passed}/{total_tests} tests pasados")
+
+    if total_passed == total_tests:
+        console.print("[green]✅ Todos los tests pasan![/green]")
+    else:
+        console.print(f"[red]❌ {total_tests - total_passed} tests fallaron[/red]")
+
+
+if __name__ == "__main__":
+    run_all_tests()